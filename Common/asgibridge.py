@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+# request headers that change the response, so they are part of the coalescing key
+VARYING_HEADERS = (b'accept-encoding', b'if-none-match')
+
+
+async def readBody(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body = body + message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+class CoalescingBridge:
+    """Serves a blocking WSGI app over ASGI from a thread pool: ``app = CoalescingBridge(flaskApp, 8)``.
+
+    Concurrent GETs for the same path, query and varying headers run the view once
+    and all receive its response; other methods run on the pool uncoalesced.
+    """
+
+    def __init__(self, wsgiApp, workers):
+        self.wsgiApp = wsgiApp
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._inflight = {}
+
+    def respond(self, environ):
+        # blocking: everything the view does happens here, on an executor thread
+        body, status, headers = run_wsgi_app(self.wsgiApp, environ, buffered=True)
+        try:
+            return int(status.split(' ', 1)[0]), headers.to_wsgi_list(), b''.join(body)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+    async def coalesced(self, key, environ):
+        """The response of the in-flight request for ``key``, starting one if there is none."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, self.respond, environ)
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._inflight.pop(key, None))
+        # shield so one client disconnecting does not cancel the others' response
+        return await asyncio.shield(future)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    self.executor.shutdown(wait=False)
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        body = await readBody(receive)
+        headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']]
+        environ = EnvironBuilder(path=scope['path'], method=scope['method'], headers=headers, data=body,
+                                 query_string=scope['query_string'].decode('latin-1')).get_environ()
+
+        if scope['method'] == 'GET':
+            varying = tuple(value for name, value in scope['headers'] if name in VARYING_HEADERS)
+            key = (scope['path'], scope['query_string'], varying)
+            status, responseHeaders, content = await self.coalesced(key, environ)
+        else:
+            status, responseHeaders, content = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.respond, environ)
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in responseHeaders],
+        })
+        await send({'type': 'http.response.body', 'body': content})
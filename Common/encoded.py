@@ -0,0 +1,52 @@
+import gzip
+import hashlib
+import json
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+GZIP_LEVEL = 6
+
+
+def dumps(payload):
+    """Compact, key-sorted JSON bytes; orjson when it is installed, else the stdlib encoder."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+
+class Encoded:
+    """A payload serialized once, with its gzip variant and strong ETags.
+
+    The ETag is a hash of the JSON body, so a refresh that produces the same data
+    keeps the same tag and clients keep getting 304s.
+    """
+
+    def __init__(self, payload):
+        self.body = dumps(payload)
+        # mtime=0 keeps the compressed bytes identical for identical bodies
+        self.gzipped = gzip.compress(self.body, GZIP_LEVEL, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = digest
+        self.gzipEtag = digest + '-gz'
+
+    def response(self, age=None):
+        """Response for the current request: 304, gzip or identity."""
+        useGzip = request.accept_encodings['gzip'] > 0
+        etag = self.gzipEtag if useGzip else self.etag
+        if self.etag in request.if_none_match or self.gzipEtag in request.if_none_match:
+            response = Response(status=304)
+        elif useGzip:
+            response = Response(self.gzipped, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(self.body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        if age is not None:
+            response.headers['Age'] = str(int(age))
+        return response
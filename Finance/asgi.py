@@ -0,0 +1,19 @@
+import os
+import sys
+from server import app as flaskApp
+
+# modules shared with the other exporters live in ../Common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Common'))
+from asgibridge import CoalescingBridge
+
+ASGI_WORKERS = int(os.getenv('FINANCE_ASGI_WORKERS', '8'))
+
+# ASGI entry point: ``uvicorn asgi:app``. Identical concurrent GETs run the Flask view
+# once on the pool and all receive its response; POST /refresh runs uncoalesced.
+app = CoalescingBridge(flaskApp, ASGI_WORKERS)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='127.0.0.1', port=int(os.getenv('PORT', '5000')))
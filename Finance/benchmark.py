@@ -0,0 +1,298 @@
+import argparse
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import requests
+from dateutil.relativedelta import relativedelta
+import stub
+from ledger import Ledger, fields
+from main import OperationsFetcher
+
+# children run their scripts and modules from here, whatever directory the benchmark was started in
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def legacyCheck(baseUrl):
+    # the original check(): page 1 twice, 25 rows per page, one connection per request
+    temp = requests.get(baseUrl + "/operations.json?page=1.json")
+    count = temp.json()["total_count"]
+    pages = -(-count // 25)
+    res = []
+    for i in range(pages):
+        res.append(requests.get(baseUrl + "/operations.json?page=" + str(i + 1) + ".json").json())
+    return {'val': res}
+
+
+def timed(server, run):
+    server.requestCount = 0
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start, server.requestCount
+
+
+def benchFetch(pageCounts, latency, workers):
+    print("%8s %12s %10s %12s %10s %8s" % ("pages", "legacy s", "requests", "pooled s", "requests", "speedup"))
+    for pages in pageCounts:
+        server = stub.serve(stub.syntheticOperations(pages * 25), latency=latency)
+        legacyTime, legacyRequests = timed(server, lambda: legacyCheck(server.url))
+        fetcher = OperationsFetcher(server.url, "", workers)
+        pooledTime, pooledRequests = timed(server, fetcher.fetchAll)
+        server.shutdown()
+        print("%8d %12.3f %10d %12.3f %10d %7.1fx" % (pages, legacyTime, legacyRequests, pooledTime,
+                                                      pooledRequests, legacyTime / pooledTime))
+
+
+def legacyWindows(jsonContent, windowMonths):
+    # one full scan per window with per-record string slicing, as func() used to do
+    totals = []
+    for months in windowMonths:
+        cutoff = date.today() - relativedelta(months=+months)
+        income = 0
+        expense = 0
+        for page in jsonContent['val']:
+            for operation in page['operations']:
+                ifIncome = 0
+                ifDateExist = 0
+                for key, value in operation.items():
+                    if str(key) == "operation_date" and str(date.today()) >= str(value[:10]) >= str(cutoff):
+                        ifDateExist = 1
+                    if str(key) == "is_income" and value == 1:
+                        ifIncome = 1
+                for key, value in operation.items():
+                    if ifDateExist == 1 and str(key) == "amount":
+                        if ifIncome == 1:
+                            income = income + float(value)
+                        else:
+                            expense = expense + float(value)
+        totals.append((income, expense))
+    return totals
+
+
+def indexedWindows(ledger, windowMonths):
+    today = date.today()
+    cutoffs = [(today - relativedelta(months=+months)).toordinal() for months in windowMonths]
+    incomes, expenses, categorySums = ledger.windowTotals(cutoffs, today.toordinal())
+    return list(zip(incomes, expenses))
+
+
+def benchWindows(counts, repeat):
+    windowMonths = [18, 15, 12, 9, 6, 3, 1]
+    print("%10s %12s %14s %14s %9s" % ("operations", "legacy ms", "index build ms", "indexed ms", "speedup"))
+    for count in counts:
+        operations = stub.syntheticOperations(count)
+        jsonContent = {'val': [{'operations': operations[i:i + 100]} for i in range(0, count, 100)]}
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            legacyWindows(jsonContent, windowMonths)
+        legacy = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        ledger = Ledger.fromPages(jsonContent)
+        ledger.index
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            indexedWindows(ledger, windowMonths)
+        indexed = (time.perf_counter() - start) / repeat
+        print("%10d %12.1f %14.1f %14.3f %8.0fx" % (count, legacy * 1000, build * 1000, indexed * 1000,
+                                                    legacy / indexed))
+
+
+def peakRss():
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def rssGrowth(output):
+    # MiB the child's peak RSS grew by over the RSS it started the measured work with
+    return (int(output[2]) - int(output[1])) / 1024
+
+
+def loadLedger(path, url):
+    fetcher = OperationsFetcher(url, "")
+    if path == "pages":
+        return Ledger.fromPages({'val': fetcher.fetchAll()})
+    return Ledger.fromRows(fetcher.stream(fields))
+
+
+def freePort():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def waitForPort(port, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("child exited with status %d before listening on port %d"
+                                   % (process.returncode, port))
+            if time.monotonic() >= deadline:
+                process.terminate()
+                raise RuntimeError("nothing listening on port %d after %ds" % (port, timeout))
+            time.sleep(0.2)
+
+
+def startStub(count, *options):
+    port = freePort()
+    process = subprocess.Popen([sys.executable, "stub.py", "--count", str(count), "--port", str(port)] + list(options),
+                               cwd=HERE, stdout=subprocess.DEVNULL)
+    waitForPort(port, process)
+    return process, "http://127.0.0.1:%d" % port
+
+
+def benchMemory(counts):
+    # each ingestion path runs in a fresh process so ru_maxrss is its own peak
+    print("%10s %8s %10s %14s" % ("operations", "path", "seconds", "RSS growth MiB"))
+    for count in counts:
+        process, url = startStub(count)
+        for path in ("pages", "stream"):
+            output = subprocess.run([sys.executable, "benchmark.py", "memory", "--child", path, "--url", url],
+                                    cwd=HERE, capture_output=True, text=True, check=True).stdout.split()
+            print("%10d %8s %10s %14.1f" % (count, path, output[0], rssGrowth(output)))
+        process.terminate()
+        process.wait()
+
+
+def upstreamRequests(url):
+    return requests.get(url + "/stats").json()["requests"]
+
+
+def runDashboard():
+    # one cold dashboard refresh: fetch, func() and graph() off the same dataset
+    import graph
+    from dataset import loadDataset
+    from func import func
+
+    dataset = loadDataset()
+    func(dataset)
+    graph.graph(dataset)
+
+
+def benchSuite(counts, days, categories):
+    print("%10s %10s %10s %14s" % ("operations", "seconds", "requests", "RSS growth MiB"))
+    for count in counts:
+        process, url = startStub(count, "--days", str(days), "--categories", categories)
+        before = upstreamRequests(url)
+        # FINANCE_* settings are read at import, so the refresh runs in a child process
+        environment = dict(os.environ, FINANCE_URL=url)
+        environment.pop("FINANCE_STORE", None)
+        output = subprocess.run([sys.executable, "benchmark.py", "suite", "--child"], cwd=HERE, env=environment,
+                                capture_output=True, text=True, check=True).stdout.splitlines()[-1].split()
+        requestCount = upstreamRequests(url) - before
+        process.terminate()
+        process.wait()
+        print("%10d %10s %10d %14.1f" % (count, output[0], requestCount, rssGrowth(output)))
+
+
+def startServer(mode, url):
+    port = freePort()
+    environment = dict(os.environ, FINANCE_URL=url)
+    environment.pop("FINANCE_STORE", None)
+    environment.pop("FINANCE_TENANTS", None)
+    if mode == "wsgi":
+        command = [sys.executable, "-c", "from server import app; app.run(port=%d, threaded=True)" % port]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=HERE, env=environment, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    waitForPort(port, process)
+    return process, "http://127.0.0.1:%d" % port
+
+
+def hammer(url, clients, seconds):
+    # ``clients`` threads issuing back-to-back requests; returns (completed, latencies)
+    deadline = time.perf_counter() + seconds
+    latencies = []
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            session.get(url).raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for future in [pool.submit(client) for _ in range(clients)]:
+            future.result()
+    return sorted(latencies)
+
+
+def benchLoad(count, clients, seconds, path):
+    print("%6s %10s %10s %10s %10s %10s" % ("mode", "requests", "req/s", "p50 ms", "p99 ms", "upstream"))
+    stubProcess, stubUrl = startStub(count)
+    for mode in ("wsgi", "asgi"):
+        process, url = startServer(mode, stubUrl)
+        before = upstreamRequests(stubUrl)
+        latencies = hammer(url + path, clients, seconds)
+        upstream = upstreamRequests(stubUrl) - before
+        process.terminate()
+        process.wait()
+        print("%6s %10d %10.1f %10.1f %10.1f %10d" % (mode, len(latencies), len(latencies) / seconds,
+                                                       latencies[len(latencies) // 2] * 1000,
+                                                       latencies[int(len(latencies) * 0.99)] * 1000, upstream))
+    stubProcess.terminate()
+    stubProcess.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Finance exporter")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch = commands.add_parser("fetch", help="sequential vs pooled page fetching")
+    fetch.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000],
+                       help="ledger sizes, in legacy 25-row pages")
+    fetch.add_argument("--latency", type=float, default=0.005, help="stub latency per request, seconds")
+    fetch.add_argument("--workers", type=int, default=8)
+
+    windows = commands.add_parser("windows", help="string-scan vs date-indexed window totals")
+    windows.add_argument("--count", type=int, nargs="+", default=[1000, 10000, 100000])
+    windows.add_argument("--repeat", type=int, default=3)
+
+    memory = commands.add_parser("memory", help="peak RSS of whole-page vs streaming ingestion")
+    memory.add_argument("--count", type=int, nargs="+", default=[1000000])
+    memory.add_argument("--child", choices=["pages", "stream"], help=argparse.SUPPRESS)
+    memory.add_argument("--url", help=argparse.SUPPRESS)
+    suite = commands.add_parser("suite", help="end-to-end dashboard refresh against the stub")
+    suite.add_argument("--count", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    suite.add_argument("--days", type=int, default=730)
+    suite.add_argument("--categories", default=",".join(stub.CATEGORIES), help="e.g. salary=3,rent=1,travel")
+    suite.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    load = commands.add_parser("load", help="threaded Flask vs ASGI throughput under concurrent clients")
+    load.add_argument("--count", type=int, default=20000)
+    load.add_argument("--clients", type=int, default=50)
+    load.add_argument("--seconds", type=float, default=10)
+    load.add_argument("--path", default="/windows?windows=1m,3m,6m,12m,24m&granularity=day&categories=1")
+    args = parser.parse_args()
+
+    if args.command == "load":
+        benchLoad(args.count, args.clients, args.seconds, args.path)
+    elif args.command == "suite" and args.child:
+        before = peakRss()
+        start = time.perf_counter()
+        runDashboard()
+        print("%.2f %d %d" % (time.perf_counter() - start, before, peakRss()))
+    elif args.command == "suite":
+        benchSuite(args.count, args.days, args.categories)
+    elif args.command == "fetch":
+        benchFetch(args.pages, args.latency, args.workers)
+    elif args.command == "windows":
+        benchWindows(args.count, args.repeat)
+    elif args.child:
+        before = peakRss()
+        start = time.perf_counter()
+        loadLedger(args.child, args.url)
+        print("%.2f %d %d" % (time.perf_counter() - start, before, peakRss()))
+    else:
+        benchMemory(args.count)
@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+import time
+from datetime import date
+from ledger import Ledger, MonthlyLedger, fields
+from main import CAT_API_KEY, REDMINE_URL, WORKERS, OperationsFetcher, pooledSession
+from store import OperationStore, STORE_PATH
+
+CACHE_TTL = int(os.getenv('FINANCE_CACHE_TTL', '60'))
+TENANTS_PATH = os.getenv('FINANCE_TENANTS')
+
+
+class TtlCache:
+    """Holds the last value returned by ``load`` for ``ttl`` seconds.
+
+    Callers arriving while a load is in flight wait for it and share its result,
+    so concurrent panel requests cost a single upstream fetch.
+    """
+
+    def __init__(self, load, ttl=CACHE_TTL):
+        self.load = load
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._loadedAt = None
+
+    def get(self):
+        with self._lock:
+            if self._loadedAt is None or time.monotonic() - self._loadedAt >= self.ttl:
+                self._value = self.load()
+                self._loadedAt = time.monotonic()
+            return self._value
+
+    def refresh(self):
+        """Reload now regardless of age and return the new value."""
+        with self._lock:
+            self._value = self.load()
+            self._loadedAt = time.monotonic()
+            return self._value
+
+
+class Dataset:
+    """The operations behind one dashboard request and the aggregates built from them."""
+
+    def __init__(self, ledger, today=None, monthly=None):
+        self.ledger = ledger
+        self.today = today or date.today()
+        self._monthly = monthly
+
+    @property
+    def monthly(self):
+        if self._monthly is None or self._monthly.today != self.today:
+            self._monthly = MonthlyLedger(self.ledger, self.today)
+        return self._monthly
+
+
+class Tenant:
+    """One Redmine finance ledger: its fetcher, optional store and cached operations."""
+
+    def __init__(self, name, baseUrl=REDMINE_URL, apiKey=CAT_API_KEY, storePath=None, session=None):
+        self.name = name
+        self.fetcher = OperationsFetcher(baseUrl, apiKey, session=session)
+        self.store = OperationStore(storePath, self.fetcher) if storePath else None
+        self.operationsCache = TtlCache(self.loadOperations)
+        self._ledger = None
+        self._maintainedMonthly = None
+
+    def followChanges(self, ledger, changes):
+        """The monthly series kept across store syncs, updated with only the changed operations.
+
+        Each sync swaps in a new series rather than editing the one earlier datasets
+        hold. It is rebuilt after a full resync and when the day rolls over, since
+        every trailing-month bucket boundary moves with today.
+        """
+        today = date.today()
+        monthly = self._maintainedMonthly
+        if monthly is None or changes is None or monthly.today != today:
+            monthly = MonthlyLedger(ledger, today)
+        else:
+            monthly = monthly.withChanges(changes)
+        self._maintainedMonthly = monthly
+        return monthly
+
+    def loadOperations(self):
+        # with a store, only operations changed since the last sync are downloaded and
+        # folded into the ledger already in memory; it is only re-read after a full resync
+        if self.store:
+            self.store.sync()
+            changes = self.store.lastChanges
+            if self._ledger is None or changes is None:
+                self._ledger = self.store.ledger()
+            else:
+                self._ledger = self._ledger.withChanges(changes)
+            return self._ledger, self.followChanges(self._ledger, changes)
+        return Ledger.fromRows(self.fetcher.stream(fields)), None
+
+    def loadDataset(self, fresh=False):
+        ledger, monthly = self.operationsCache.refresh() if fresh else self.operationsCache.get()
+        return Dataset(ledger, monthly=monthly)
+
+
+def loadTenants():
+    """Tenants from the FINANCE_TENANTS JSON file, or a single "default" one from FINANCE_URL.
+
+    The file maps tenant names to {"url": ..., "api": ..., "store": ...}; "store" is optional.
+    All tenants share one pooled HTTP session.
+    """
+    if not TENANTS_PATH:
+        return {'default': Tenant('default', storePath=STORE_PATH)}
+    with open(TENANTS_PATH) as tenantsFile:
+        config = json.load(tenantsFile)
+    session = pooledSession(WORKERS * len(config), hosts=len(config))
+    return {name: Tenant(name, settings['url'], settings['api'], settings.get('store'), session)
+            for name, settings in config.items()}
+
+
+tenants = loadTenants()
+DEFAULT_TENANT = os.getenv('FINANCE_DEFAULT_TENANT') or next(iter(tenants))
+
+
+def loadDataset(fresh=False):
+    return tenants[DEFAULT_TENANT].loadDataset(fresh)
@@ -0,0 +1,109 @@
+import math
+import re
+from datetime import date
+
+AGGREGATIONS = ['sum', 'min', 'max', 'count', 'mean']
+DEFAULT_AGGREGATIONS = 'sum'
+METHODS = ['bucket', 'lttb']
+
+_intervalPattern = re.compile(r'^(\d+)([dw])$')
+
+
+def parseInterval(spec):
+    """'1d' -> 1, '2w' -> 14 (days); raises ValueError.
+
+    Operations only carry a date, so a day is the finest interval there is.
+    """
+    spec = spec.strip().lower()
+    if spec in ('day', 'week'):
+        spec = '1' + spec[0]
+    match = _intervalPattern.match(spec)
+    if not match or int(match.group(1)) == 0:
+        raise ValueError("invalid interval %r, expected e.g. 1d, 3d or 1w" % spec)
+    return int(match.group(1)) * (7 if match.group(2) == 'w' else 1)
+
+
+def parseAggregations(specs):
+    aggregations = [spec.strip().lower() for spec in specs.split(',')]
+    for aggregation in aggregations:
+        if aggregation not in AGGREGATIONS:
+            raise ValueError("aggregation must be one of " + ", ".join(AGGREGATIONS))
+    return aggregations
+
+
+def bucketed(points, start, end, interval=None, aggregations=('sum',), maxDataPoints=None):
+    """Aggregate (ordinal, value) points, oldest first, into fixed ``interval``-day
+    buckets covering start..end (ordinals, inclusive).
+
+    Without an interval the buckets are sized to fit ``maxDataPoints``; with one,
+    it is widened when needed. Every bucket is emitted, so gaps show as count 0
+    and null min/max/mean; ``value`` repeats the first aggregation.
+    """
+    days = end - start + 1
+    if interval is None:
+        interval = 1
+    if maxDataPoints:
+        interval = max(interval, math.ceil(days / maxDataPoints))
+    count = math.ceil(days / interval)
+    sums = [0.0] * count
+    counts = [0] * count
+    minimums = [None] * count
+    maximums = [None] * count
+    for ordinal, value in points:
+        position = (ordinal - start) // interval
+        sums[position] += value
+        counts[position] += 1
+        if minimums[position] is None or value < minimums[position]:
+            minimums[position] = value
+        if maximums[position] is None or value > maximums[position]:
+            maximums[position] = value
+
+    series = []
+    for position in range(count):
+        values = {
+            'sum': sums[position],
+            'min': minimums[position],
+            'max': maximums[position],
+            'count': counts[position],
+            'mean': sums[position] / counts[position] if counts[position] else None,
+        }
+        point = {'date': date.fromordinal(start + position * interval).isoformat()}
+        for aggregation in aggregations:
+            point[aggregation] = values[aggregation]
+        point['value'] = values[aggregations[0]]
+        series.append(point)
+    return series
+
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: ``threshold`` of the (x, y) points that keep
+    the shape of the line, always including the first and last.
+
+    The kept points are original points, not averages, so spikes survive.
+    """
+    if threshold >= len(points):
+        return list(points)
+    if threshold < 3:
+        return [points[0], points[-1]]
+    sampled = [points[0]]
+    width = (len(points) - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        low = int(bucket * width) + 1
+        high = int((bucket + 1) * width) + 1
+        # the average of the next bucket stands in for the point that will be picked there
+        nextLow, nextHigh = high, min(int((bucket + 2) * width) + 1, len(points))
+        averageX = sum(x for x, y in points[nextLow:nextHigh]) / (nextHigh - nextLow)
+        averageY = sum(y for x, y in points[nextLow:nextHigh]) / (nextHigh - nextLow)
+        anchorX, anchorY = points[previous]
+        largest = -1.0
+        for position in range(low, high):
+            x, y = points[position]
+            area = abs((anchorX - averageX) * (y - anchorY) - (anchorX - x) * (averageY - anchorY))
+            if area > largest:
+                largest = area
+                chosen = position
+        sampled.append(points[chosen])
+        previous = chosen
+    sampled.append(points[-1])
+    return sampled
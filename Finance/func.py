@@ -1,422 +1,70 @@
-import datetime
 import math
+import os
 from datetime import date
 from dateutil.relativedelta import relativedelta
-from graph import graph
 import graph
-from main import check
-
-
-def func():
-    jsonContent = check()
-    incomefor24m = 0
-    expensefor24m = 0
-    overallProfit = 0
-    overallIncome = 0
-    overallExpense = 0
-    incomeFor18Months = 0
-    expenseFor18Months = 0
-    incomeFor15Months = 0
-    expenseFor15Months = 0
-    profitFortwelveMonths = 0
-    incomeFortwelveMonths = 0
-    expenseFortwelveMonths = 0
-    incomeForNineMonths = 0
-    expenseForNineMonths = 0
-    incomeForSixMonths = 0
-    expenseForSixMonths = 0
-    profitForthreeMonths = 0
-    incomeForthreeMonths = 0
-    expenseForthreeMonths = 0
-    incomeForoneMonths = 0
-    expenseForoneMonths = 0
-    monthlymisllaneous = 0
-    monthlysalary = 0
-    monthlyOfficeDetails = 0
-    quartelymisllaneous = 0
-    quarterlysalary = 0
-    quarterlyOfficeDetails = 0
-    yearlymisllaneous = 0
-    yearlysalary = 0
-    yearlyOfficeDetails = 0
-    oneMonthProfitGraph = []
-
-    for check1, check2 in jsonContent.items():
-
-        for check3 in check2:
-
-            lasttwelveMonthsDate = date.today() - relativedelta(months=+12)
-
-            last12to24 = date.today() - relativedelta(months=+24)
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-
-                        ifIncome = 0
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(
-                                    details2[:10]) and str(last12to24) <= str(details2[:10]):
-                                ifDateExist = 1
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifDateExist == 1 and ifIncome == 1 and str(details1) == "amount":
-                                incomefor24m = incomefor24m + float(details2)
-
-                            elif ifDateExist == 1 and ifIncome == 0 and str(details1) == "amount":
-                                expensefor24m = expensefor24m + float(details2)
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-                        ifIncome = 0
-
-                        for details1, details2 in test1.items():
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifIncome == 1 and str(details1) == "amount":
-                                overallIncome = overallIncome + float(details2)
-
-                            elif ifIncome == 0 and str(details1) == "amount":
-                                overallExpense = overallExpense + float(details2)
-
-            overallProfit = overallIncome - overallExpense
-
-            last18MonthsDate = date.today() - relativedelta(months=+18)
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-                        ifIncome = 0
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(
-                                    details2[:10]) and str(last18MonthsDate) <= str(details2[:10]):
-                                ifDateExist = 1
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifDateExist == 1 and ifIncome == 1 and str(details1) == "amount":
-                                incomeFor18Months = incomeFor18Months + float(details2)
-
-                            elif ifDateExist == 1 and ifIncome == 0 and str(details1) == "amount":
-                                expenseFor18Months = expenseFor18Months + float(details2)
-
-            last15MonthsDate = date.today() - relativedelta(months=+15)
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-                        ifIncome = 0
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(
-                                    details2[:10]) and str(last15MonthsDate) <= str(details2[:10]):
-                                ifDateExist = 1
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifDateExist == 1 and ifIncome == 1 and str(details1) == "amount":
-                                incomeFor15Months = incomeFor15Months + float(details2)
-
-                            elif ifDateExist == 1 and ifIncome == 0 and str(details1) == "amount":
-                                expenseFor15Months = expenseFor15Months + float(details2)
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-
-                        ifIncome = 0
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(details2[:10]) >= str(
-                                    lasttwelveMonthsDate):
-                                ifDateExist = 1
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifDateExist == 1 and ifIncome == 1 and str(details1) == "amount":
-                                incomeFortwelveMonths = incomeFortwelveMonths + float(details2)
-
-                            elif ifDateExist == 1 and ifIncome == 0 and str(details1) == "amount":
-                                expenseFortwelveMonths = expenseFortwelveMonths + float(details2)
-
-            profitFortwelveMonths = incomeFortwelveMonths - expenseFortwelveMonths
-
-            lastNineMonthsDate = date.today() - relativedelta(months=+9)
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-
-                        ifIncome = 0
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(details2[:10]) >= str(
-                                    lastNineMonthsDate):
-                                ifDateExist = 1
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifDateExist == 1 and ifIncome == 1 and str(details1) == "amount":
-                                incomeForNineMonths = incomeForNineMonths + float(details2)
-
-                            elif ifDateExist == 1 and ifIncome == 0 and str(details1) == "amount":
-                                expenseForNineMonths = expenseForNineMonths + float(details2)
-
-            lastSixMonthsDate = date.today() - relativedelta(months=+6)
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-
-                        ifIncome = 0
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(details2[:10]) >= str(
-                                    lastSixMonthsDate):
-                                ifDateExist = 1
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifDateExist == 1 and ifIncome == 1 and str(details1) == "amount":
-                                incomeForSixMonths = incomeForSixMonths + float(details2)
-
-                            elif ifDateExist == 1 and ifIncome == 0 and str(details1) == "amount":
-                                expenseForSixMonths = expenseForSixMonths + float(details2)
-
-            lastthreeMonthsDate = date.today() - relativedelta(months=+3)
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-
-                        ifIncome = 0
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(details2[:10]) >= str(
-                                    lastthreeMonthsDate):
-                                ifDateExist = 1
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifDateExist == 1 and ifIncome == 1 and str(details1) == "amount":
-                                incomeForthreeMonths = incomeForthreeMonths + float(details2)
-
-                            elif ifDateExist == 1 and ifIncome == 0 and str(details1) == "amount":
-                                expenseForthreeMonths = expenseForthreeMonths + float(details2)
-
-            profitForthreeMonths = incomeForthreeMonths - expenseForthreeMonths
-
-            lastoneMonthsDate = date.today() - relativedelta(months=+1)
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-
-                        ifIncome = 0
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(details2[:10]) >= str(
-                                    lastoneMonthsDate):
-                                ifDateExist = 1
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifDateExist == 1 and ifIncome == 1 and str(details1) == "amount":
-                                incomeForoneMonths = incomeForoneMonths + float(details2)
-
-                            elif ifDateExist == 1 and ifIncome == 0 and str(details1) == "amount":
-                                expenseForoneMonths = expenseForoneMonths + float(details2)
-
-            # for expense pie chart
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(details2[:10]) >= str(
-                                    lastoneMonthsDate):
-                                ifDateExist = 1
-
-                        miss = 0
-                        sal = 0
-                        office = 0
-                        for details1, details2 in test1.items():
-
-                            if ifDateExist == 1 and str(details1) == "category":
-                                for category, categoryData in details2.items():
-
-                                    if category == "full_name" and categoryData == "misllaneous":
-                                        miss = 1
-
-                                    elif category == "full_name" and categoryData == "salary":
-                                        sal = 1
-                                    elif category == "full_name" and categoryData == "office maintenance":
-                                        office = 1
-                        for details1, details2 in test1.items():
-                            if miss == 1 and str(details1) == "amount":
-                                monthlymisllaneous = monthlymisllaneous + float(details2)
-
-                            elif sal == 1 and str(details1) == "amount":
-                                monthlysalary = monthlysalary + float(details2)
-
-                            elif office == 1 and str(details1) == "amount":
-                                monthlyOfficeDetails = monthlyOfficeDetails + float(details2)
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(details2[:10]) >= str(
-                                    lastthreeMonthsDate):
-                                ifDateExist = 1
-
-                        miss = 0
-                        sal = 0
-                        office = 0
-                        for details1, details2 in test1.items():
-
-                            if ifDateExist == 1 and str(details1) == "category":
-                                for category, categoryData in details2.items():
-
-                                    if category == "full_name" and categoryData == "misllaneous":
-                                        miss = 1
-
-                                    elif category == "full_name" and categoryData == "salary":
-                                        sal = 1
-                                    elif category == "full_name" and categoryData == "office maintenance":
-                                        office = 1
-
-                        for details1, details2 in test1.items():
-                            if miss == 1 and str(details1) == "amount":
-                                quartelymisllaneous = quartelymisllaneous + float(details2)
-
-                            elif sal == 1 and str(details1) == "amount":
-                                quarterlysalary = quarterlysalary + float(details2)
-
-                            elif office == 1 and str(details1) == "amount":
-                                quarterlyOfficeDetails = quarterlyOfficeDetails + float(details2)
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-                        ifDateExist = 0
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(details2[:10]) >= str(
-                                    lasttwelveMonthsDate):
-                                ifDateExist = 1
-
-                        miss = 0
-                        sal = 0
-                        office = 0
-                        for details1, details2 in test1.items():
-
-                            if ifDateExist == 1 and str(details1) == "category":
-                                for category, categoryData in details2.items():
-
-                                    if category == "full_name" and categoryData == "misllaneous":
-                                        miss = 1
-
-                                    elif category == "full_name" and categoryData == "salary":
-                                        sal = 1
-
-                                    elif category == "full_name" and categoryData == "office maintenance":
-                                        office = 1
-                        for details1, details2 in test1.items():
-                            if miss == 1 and str(details1) == "amount":
-                                yearlymisllaneous = yearlymisllaneous + float(details2)
-
-                            elif sal == 1 and str(details1) == "amount":
-                                yearlysalary = yearlysalary + float(details2)
-
-                            elif office == 1 and str(details1) == "amount":
-                                yearlyOfficeDetails = yearlyOfficeDetails + float(details2)
-
-            for row1, row2 in check3.items():
-                if str(row1) == "operations":
-                    for test1 in row2:
-
-                        ifIncome = 0
-                        ifDateExist = 0
-                        issuedDate = ""
-
-                        for details1, details2 in test1.items():
-                            if str(details1) == "operation_date" and str(date.today()) >= str(details2[:10]) >= str(
-                                    lastoneMonthsDate):
-                                ifDateExist = 1
-                                issuedDate = str(details2[:10])
-
-                            if str(details1) == "is_income" and details2 == 1:
-                                ifIncome = 1
-
-                            elif str(details1) == "is_income" and details2 == 0:
-                                ifIncome = 0
-
-                        for details1, details2 in test1.items():
-                            if ifDateExist == 1 and ifIncome == 1 and str(details1) == "amount":
-                                oneMonthProfitGraph.append(
-                                    {
-                                        "date": issuedDate,
-                                        "value": float(details2),
-                                    },
-                                )
+from dataset import loadDataset
+from downsample import lttb
+
+# categories shown individually in categoryPie, the rest are summed into "other"
+PIE_TOP = int(os.getenv('FINANCE_PIE_TOP', '10'))
+# oneMonthProfitGraph is thinned to this many points with LTTB, 0 ships every operation
+GRAPH_MAX_POINTS = int(os.getenv('FINANCE_GRAPH_MAX_POINTS', '1000'))
+
+
+def func(dataset=None):
+    if dataset is None:
+        dataset = loadDataset()
+    ledger = dataset.ledger
+
+    today = dataset.today
+    windowMonths = [18, 15, 12, 9, 6, 3, 1]
+    cutoffs = [(today - relativedelta(months=+months)).toordinal() for months in windowMonths]
+    incomes, expenses, categorySums = ledger.windowTotals(cutoffs, today.toordinal())
+    income = dict(zip(windowMonths, incomes))
+    expense = dict(zip(windowMonths, expenses))
+    pie = dict(zip(windowMonths, categorySums))
+
+    overallIncome, overallExpense = ledger.overallTotals()
+    overallProfit = overallIncome - overallExpense
+
+    incomeFor15Months = income[15]
+    expenseFor15Months = expense[15]
+    incomeFor18Months = income[18]
+    expenseFor18Months = expense[18]
+    incomeFortwelveMonths = income[12]
+    expenseFortwelveMonths = expense[12]
+    profitFortwelveMonths = incomeFortwelveMonths - expenseFortwelveMonths
+    incomeForNineMonths = income[9]
+    expenseForNineMonths = expense[9]
+    incomeForSixMonths = income[6]
+    expenseForSixMonths = expense[6]
+    incomeForthreeMonths = income[3]
+    expenseForthreeMonths = expense[3]
+    profitForthreeMonths = incomeForthreeMonths - expenseForthreeMonths
+    incomeForoneMonths = income[1]
+    expenseForoneMonths = expense[1]
+
+    # for expense pie chart
+    monthlymisllaneous = ledger.categoryTotal(pie[1], "misllaneous")
+    monthlysalary = ledger.categoryTotal(pie[1], "salary")
+    monthlyOfficeDetails = ledger.categoryTotal(pie[1], "office maintenance")
+    quartelymisllaneous = ledger.categoryTotal(pie[3], "misllaneous")
+    quarterlysalary = ledger.categoryTotal(pie[3], "salary")
+    quarterlyOfficeDetails = ledger.categoryTotal(pie[3], "office maintenance")
+    yearlymisllaneous = ledger.categoryTotal(pie[12], "misllaneous")
+    yearlysalary = ledger.categoryTotal(pie[12], "salary")
+    yearlyOfficeDetails = ledger.categoryTotal(pie[12], "office maintenance")
+    categoryPie = {
+        'month': ledger.categoryBreakdown(pie[1], PIE_TOP),
+        'quarter': ledger.categoryBreakdown(pie[3], PIE_TOP),
+        'year': ledger.categoryBreakdown(pie[12], PIE_TOP),
+    }
 
-                            elif ifDateExist == 1 and ifIncome == 0 and str(details1) == "amount":
-                                oneMonthProfitGraph.append(
-                                    {
-                                        "date": issuedDate,
-                                        "value": 0 - float(details2),
-                                    },
-                                )
-    oneMonthProfitGraph.reverse()
+    points = list(ledger.signedValues(cutoffs[-1], today.toordinal()))
+    if GRAPH_MAX_POINTS:
+        points = lttb(points, GRAPH_MAX_POINTS)
+    oneMonthProfitGraph = [{"date": date.fromordinal(ordinal).isoformat(), "value": value} for ordinal, value in points]
     # runway
     totalMoney = incomeFortwelveMonths - expenseFortwelveMonths
     avgExpense = expenseFortwelveMonths / 12
@@ -456,63 +104,11 @@ def func():
     except:
         print("divided by 0")
 
-    profitGraphFunc = graph.graph()
-
-    x = 0
-    yearProfitList = []
-
-    for i in range(12):
-        yearProfitList.append(
-            {
-                "date": str(datetime.datetime.now() - relativedelta(months=+i))[:19],
-                "value": profitGraphFunc[i]
-            },
-        )
-        x = x + 1
-
-    yearProfitList.reverse()
-
-    x = 0
-    yearGrowthList = []
-    for i in range(13):
-        if i != 0:
-            yearGrowthList.append(
-                {
-                    "date": str(datetime.datetime.now() - relativedelta(months=+x - 1))[:19],
-                    "value": ((profitGraphFunc[i - 1] - profitGraphFunc[i]) / math.fabs(profitGraphFunc[i])) * 100,
-                },
-            )
-        x = x + 1
-    yearGrowthList.reverse()
-
-    #
-
-    x = 0
-    quarterProfitList = []
-
-    for i in range(3):
-        quarterProfitList.append(
-            {
-                "date": str(datetime.datetime.now() - relativedelta(months=+i))[:19],
-                "value": profitGraphFunc[i]
-            },
-        )
-        x = x + 1
-
-    quarterProfitList.reverse()
-
-    x = 0
-    quarterGrowthList = []
-    for i in range(4):
-        if i != 0:
-            quarterGrowthList.append(
-                {
-                    "date": str(datetime.datetime.now() - relativedelta(months=+x - 1))[:19],
-                    "value": ((profitGraphFunc[i - 1] - profitGraphFunc[i]) / math.fabs(profitGraphFunc[i])) * 100,
-                },
-            )
-        x = x + 1
-    quarterGrowthList.reverse()
+    monthly = dataset.monthly
+    yearProfitList = graph.profitSeries(monthly, 12)
+    yearGrowthList = graph.growthSeries(monthly, 12)
+    quarterProfitList = graph.profitSeries(monthly, 3)
+    quarterGrowthList = graph.growthSeries(monthly, 3)
     colorMonthly = "red"
     if expenseForoneMonths <= spendingCapabilitesmonthly:
         colorMonthly = "green"
@@ -530,7 +126,7 @@ def func():
         colorYearly = "green"
     elif expenseFortwelveMonths < 1.5 * spendingCapabilitesyearly:
         colorYearly = "yellow"
-    print(profitGraphFunc[0])
+    print(monthly.profit(0))
     return {
         'expenseMonthly': {
 
@@ -598,6 +194,7 @@ def func():
             'yearlysalary': yearlysalary,
             'yearlyOffice': yearlyOfficeDetails
         },
+        'categoryPie': categoryPie,
 
         'profitGraph': yearProfitList,
         'newGrowthGraph': yearGrowthList,
@@ -606,7 +203,7 @@ def func():
         'growthGraphForQuarter': quarterGrowthList,
 
         'lastMonthProfitPercent': {
-            'lastMonthProfitPercent': ((profitGraphFunc[0] - profitGraphFunc[1]) / math.fabs(profitGraphFunc[1])) * 100,
+            'lastMonthProfitPercent': monthly.growth(0),
         },
 
     }
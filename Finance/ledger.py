@@ -0,0 +1,301 @@
+import copy
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from itertools import accumulate
+from dateutil.relativedelta import relativedelta
+
+
+def toOrdinal(operationDate):
+    # 0 stands for an operation without a date
+    if not operationDate:
+        return 0
+    return date.fromisoformat(str(operationDate)[:10]).toordinal()
+
+
+def fields(operation):
+    # the only parts of an operation the aggregations read
+    category = operation.get("category") or {}
+    return (operation.get("operation_date"), operation.get("is_income") == 1,
+            operation.get("amount"), category.get("full_name"))
+
+
+class Ledger:
+    """Operations normalized into typed columns, one row per operation.
+
+    Dates are stored as ordinals (0 when the operation has no date), so window
+    membership is an integer comparison instead of a string slice per record.
+    """
+
+    def __init__(self):
+        self.dates = array('l')
+        self.incomes = array('b')
+        self.amounts = array('d')
+        self.categories = array('l')
+        self.categoryNames = []
+        self.categoryCodes = {}
+        # operation id -> row, for ledgers loaded from the store
+        self.rows = {}
+        self._index = None
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @property
+    def index(self):
+        """A DateIndex over the current rows, built on first use."""
+        if self._index is None:
+            self._index = DateIndex(self)
+        return self._index
+
+    @classmethod
+    def fromPages(cls, jsonContent):
+        ledger = cls()
+        for pages in jsonContent.values():
+            for page in pages:
+                for operation in page.get("operations", []):
+                    ledger.add(operation)
+        return ledger
+
+    @classmethod
+    def fromRows(cls, rows):
+        """Build from ``fields()`` tuples, e.g. streamed straight off the wire."""
+        ledger = cls()
+        for row in rows:
+            ledger.append(*row)
+        return ledger
+
+    def categoryCode(self, name):
+        code = self.categoryCodes.get(name)
+        if code is None:
+            code = len(self.categoryNames)
+            self.categoryCodes[name] = code
+            self.categoryNames.append(name)
+        return code
+
+    def add(self, operation):
+        self.append(*fields(operation))
+
+    def append(self, operationDate, isIncome, amount, category, operationId=None):
+        if operationId is not None:
+            self.rows[operationId] = len(self.amounts)
+        self.dates.append(toOrdinal(operationDate))
+        self.incomes.append(1 if isIncome else 0)
+        self.amounts.append(float(amount) if amount is not None else 0.0)
+        self.categories.append(self.categoryCode(category))
+        self._index = None
+
+    def withChanges(self, changes):
+        """A new ledger with the store's ``(id, previous, current)`` changes applied.
+
+        Datasets already handed out keep reading this ledger, so the columns are
+        copied rather than edited. A changed operation keeps its row and a new one
+        is appended; without changes this ledger itself is returned.
+        """
+        if not changes:
+            return self
+        ledger = Ledger()
+        ledger.dates = array('l', self.dates)
+        ledger.incomes = array('b', self.incomes)
+        ledger.amounts = array('d', self.amounts)
+        ledger.categories = array('l', self.categories)
+        ledger.categoryNames = list(self.categoryNames)
+        ledger.categoryCodes = dict(self.categoryCodes)
+        ledger.rows = dict(self.rows)
+        for operationId, previous, (operationDate, isIncome, amount, category) in changes:
+            row = ledger.rows.get(operationId)
+            if row is None:
+                ledger.append(operationDate, isIncome, amount, category, operationId)
+                continue
+            ledger.dates[row] = toOrdinal(operationDate)
+            ledger.incomes[row] = 1 if isIncome else 0
+            ledger.amounts[row] = float(amount) if amount is not None else 0.0
+            ledger.categories[row] = ledger.categoryCode(category)
+        return ledger
+
+    def overallTotals(self):
+        index = self.index
+        return index.cumulativeIncome[-1], index.cumulativeExpense[-1]
+
+    def windowTotals(self, cutoffs, today):
+        """Income, expense and per-category sums for each cutoff..today window.
+
+        ``cutoffs`` and ``today`` are date ordinals. Totals come straight from the date
+        index; category sums (income and expense alike, lists indexed by category code)
+        take one pass over the widest window, newest rows first, copying the running
+        sums as each cutoff is crossed.
+        """
+        index = self.index
+        incomes = []
+        expenses = []
+        for cutoff in cutoffs:
+            income, expense = index.totals(cutoff, today)
+            incomes.append(income)
+            expenses.append(expense)
+
+        sums = [0] * len(self.categoryNames)
+        crossed = {}
+        high = bisect_right(index.dates, today)
+        for cutoff in sorted(set(cutoffs), reverse=True):
+            low = bisect_left(index.dates, cutoff, 0, high)
+            for row in index.order[low:high]:
+                category = self.categories[row]
+                sums[category] = sums[category] + self.amounts[row]
+            crossed[cutoff] = list(sums)
+            high = low
+        return incomes, expenses, [crossed[cutoff] for cutoff in cutoffs]
+
+    def categoryTotal(self, categorySums, name):
+        code = self.categoryCodes.get(name)
+        if code is None:
+            return 0
+        return categorySums[code]
+
+    def categoryBreakdown(self, categorySums, top=None):
+        """Every category with a non-zero sum, largest first.
+
+        With ``top``, categories past the first ``top`` are folded into one "other" entry.
+        """
+        ranked = sorted(((value, code) for code, value in enumerate(categorySums) if value), reverse=True)
+        breakdown = [{'category': self.categoryNames[code] or "uncategorized", 'value': value}
+                     for value, code in ranked]
+        if top is not None and len(breakdown) > top:
+            other = sum(item['value'] for item in breakdown[top:])
+            breakdown = breakdown[:top] + [{'category': "other", 'value': other}]
+        return breakdown
+
+    def signedValues(self, cutoff, today):
+        """(date ordinal, signed amount) for every operation in cutoff..today, oldest first."""
+        low, high = self.index.span(cutoff, today)
+        for row in self.index.order[low:high]:
+            amount = self.amounts[row]
+            yield self.dates[row], amount if self.incomes[row] else 0 - amount
+
+
+class DateIndex:
+    """Ledger rows sorted by date, with running income and expense totals.
+
+    Totals for any date range are two bisects and two subtractions.
+    """
+
+    def __init__(self, ledger):
+        # rows come newest first from Redmine; walking them backwards before the stable
+        # sort keeps same-day operations in the order the dashboard has always shown
+        self.order = array('l', sorted(range(len(ledger) - 1, -1, -1), key=ledger.dates.__getitem__))
+        self.dates = array('l', (ledger.dates[row] for row in self.order))
+        self.cumulativeIncome = array('d', accumulate(
+            (ledger.amounts[row] if ledger.incomes[row] else 0.0 for row in self.order), initial=0.0))
+        self.cumulativeExpense = array('d', accumulate(
+            (0.0 if ledger.incomes[row] else ledger.amounts[row] for row in self.order), initial=0.0))
+
+    def span(self, start, end):
+        """Positions of the rows dated ``start``..``end`` (ordinals, inclusive)."""
+        return bisect_left(self.dates, start), bisect_right(self.dates, end)
+
+    def totals(self, start, end):
+        low, high = self.span(start, end)
+        return (self.cumulativeIncome[high] - self.cumulativeIncome[low],
+                self.cumulativeExpense[high] - self.cumulativeExpense[low])
+
+
+class MonthlyLedger:
+    """Net income and expense bucketed by trailing month, with month-over-month growth.
+
+    Bucket 0 covers today - 1 month through today, bucket ``k`` covers
+    today - (k + 1) months up to (excluding) today - k months, so a trailing
+    window of ``n`` months is the sum of the first ``n`` buckets. ``add`` and
+    ``remove`` fold single operations in place, touching one bucket and the two
+    growth ratios that depend on it; ``withChanges`` does so on a copy.
+    """
+
+    def __init__(self, ledger, today, months=15):
+        index = ledger.index
+        # undated operations sort first with ordinal 0
+        firstDated = bisect_right(index.dates, 0)
+        if firstDated < len(index.dates):
+            months = max(months, self.month(index.dates[firstDated], today) + 1)
+        self.today = today
+        self.months = months
+
+        self.income = []
+        self.expense = []
+        end = today.toordinal()
+        for month in range(1, months + 1):
+            start = (today - relativedelta(months=+month)).toordinal()
+            income, expense = index.totals(start, end)
+            self.income.append(income)
+            self.expense.append(expense)
+            end = start - 1
+
+        self.growthRatios = [self._growth(month) for month in range(months)]
+
+    @staticmethod
+    def month(ordinal, today):
+        """Bucket holding the operation dated ``ordinal``, without searching."""
+        day = date.fromordinal(ordinal)
+        back = (today.year - day.year) * 12 + today.month - day.month
+        if back == 0 or day >= today - relativedelta(months=+back):
+            return max(back - 1, 0)
+        return back
+
+    def add(self, operationDate, isIncome, amount):
+        ordinal = toOrdinal(operationDate)
+        if not ordinal or ordinal > self.today.toordinal():
+            return
+        month = self.month(ordinal, self.today)
+        while month >= self.months:
+            self.income.append(0)
+            self.expense.append(0)
+            self.growthRatios.append(None)
+            self.months = self.months + 1
+
+        if isIncome:
+            self.income[month] = self.income[month] + float(amount)
+        else:
+            self.expense[month] = self.expense[month] + float(amount)
+        for neighbour in (month - 1, month):
+            if neighbour >= 0:
+                self.growthRatios[neighbour] = self._growth(neighbour)
+
+    def remove(self, operationDate, isIncome, amount):
+        self.add(operationDate, isIncome, 0 - float(amount))
+
+    def withChanges(self, changes):
+        """A new series with the store's ``(id, previous, current)`` changes folded in.
+
+        Datasets already handed out keep reading this one, so it is never edited;
+        without changes it is returned itself.
+        """
+        if not changes:
+            return self
+        monthly = copy.copy(self)
+        monthly.income = list(self.income)
+        monthly.expense = list(self.expense)
+        monthly.growthRatios = list(self.growthRatios)
+        for operationId, previous, current in changes:
+            if previous:
+                monthly.remove(*previous[:3])
+            monthly.add(*current[:3])
+        return monthly
+
+    def _growth(self, month):
+        earlier = self.profit(month + 1)
+        if not earlier:
+            return None
+        return ((self.profit(month) - earlier) / math.fabs(earlier)) * 100
+
+    def profit(self, month):
+        """Net profit of the ``month``-th trailing month bucket (0 is the current one)."""
+        if month >= self.months:
+            return 0
+        return self.income[month] - self.expense[month]
+
+    def growth(self, month):
+        """Percent change of ``month``'s profit over the month before it; None if that was zero."""
+        if month >= self.months:
+            return None
+        return self.growthRatios[month]
+
+    def profits(self, months):
+        return [self.profit(month) for month in range(months)]
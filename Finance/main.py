@@ -1,40 +1,117 @@
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from stream import iterArray
+
+REDMINE_URL = os.getenv('FINANCE_URL', 'http://localhost:8080')
+CAT_API_KEY = os.getenv('FINANCE_API', 'c7523607ed9cb408ab106017be05b30c8796e8e8')
+WORKERS = int(os.getenv('FINANCE_WORKERS', '8'))
+
+# Redmine caps ``limit`` at 100 rows per page
+PAGE_LIMIT = 100
+RETRIES = 3
+BACKOFF = 0.5
+TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
+
+def pooledSession(workers=WORKERS, hosts=1):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class OperationsFetcher:
+    """Downloads every operations.json page over one keep-alive session.
+
+    The first page is fetched once to read ``total_count``; the remaining
+    pages are fetched by a bounded thread pool and returned in page order.
+    """
+
+    def __init__(self, baseUrl=REDMINE_URL, apiKey=CAT_API_KEY, workers=WORKERS, session=None):
+        self.url = baseUrl.rstrip('/') + '/operations.json'
+        self.headers = {
+            "X-Redmine-API-Key": apiKey
+        }
+        self.workers = workers
+        self.session = session or pooledSession(workers)
+
+    def request(self, offset, limit, params, read):
+        query = dict(params or {}, offset=offset, limit=limit)
+        for attempt in range(RETRIES + 1):
+            try:
+                with self.session.get(self.url, params=query, headers=self.headers,
+                                      timeout=TIMEOUT, stream=True) as response:
+                    if response.status_code != 429 and response.status_code < 500:
+                        response.raise_for_status()
+                        return read(response)
+                    if attempt == RETRIES:
+                        response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                if attempt == RETRIES:
+                    raise
+            time.sleep(BACKOFF * 2 ** attempt)
+
+    def fetchPage(self, offset, limit=PAGE_LIMIT, params=None):
+        return self.request(offset, limit, params, lambda response: response.json())
+
+    def streamPage(self, offset, fields, limit=PAGE_LIMIT, params=None):
+        """One page parsed incrementally: (operations projected through ``fields``, other members)."""
+
+        def read(response):
+            rows = []
+            operations = iterArray(response.iter_content(CHUNK_SIZE), "operations", fields)
+            while True:
+                try:
+                    rows.append(next(operations))
+                except StopIteration as done:
+                    return rows, done.value
+
+        return self.request(offset, limit, params, read)
+
+    def stream(self, fields):
+        """Every operation projected through ``fields``, in page order.
+
+        Pages are never decoded whole, and at most ``2 * workers`` pages of
+        projected rows are held at once.
+        """
+        rows, first = self.streamPage(0, fields)
+        yield from rows
+        count = first.get('total_count', 0)
+        limit = first.get('limit') or PAGE_LIMIT
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for page in range(1, math.ceil(count / limit)):
+                pending.append(pool.submit(self.streamPage, page * limit, fields, limit))
+                if len(pending) >= 2 * self.workers:
+                    yield from pending.popleft().result()[0]
+            while pending:
+                yield from pending.popleft().result()[0]
+
+    def fetchAll(self):
+        first = self.fetchPage(0)
+        count = first.get('total_count', 0)
+        # the server may cap the page size below what we asked for
+        limit = first.get('limit') or PAGE_LIMIT
+        offsets = [page * limit for page in range(1, math.ceil(count / limit))]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            rest = list(pool.map(lambda offset: self.fetchPage(offset, limit), offsets))
+        return [first] + rest
+
+
+fetcher = OperationsFetcher()
 
 
 def check():
-    CAT_API_KEY = 'c7523607ed9cb408ab106017be05b30c8796e8e8'
-
-    headers = {
-        "X-Redmine-API-Key": CAT_API_KEY
-    }
-
-    temp = requests.get(
-        "http://localhost:8080/operations.json?page=1.json",
-        headers=headers)
-    tempContent = temp.json()
-    count = 0
-    for check1, check2 in tempContent.items():
-        if check1 == "total_count":
-            count = check2
-
-    pages = int(count / 25)
-    leftPages = int(count % 25)
-    if leftPages > 0:
-        pages = pages + 1
-    url = []
-    for i in range(pages):
-        url.append("http://localhost:8080/operations.json?page=" + str(i + 1) + ".json")
-
-    # ans = []
-    res = []
-    for i in range(pages):
-        response = requests.get(
-            url[i],
-            headers=headers)
-        jsonContent = response.json()
-        # ans.append(func(jsonContent))
-        res.append(jsonContent)
-    return {'val': res}
+    return {'val': fetcher.fetchAll()}
 
 
 # check()
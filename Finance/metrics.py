@@ -0,0 +1,96 @@
+import traceback
+from prometheus_client.core import GaugeMetricFamily
+
+
+class FinanceCollector(object):
+    """Exposes each tenant's dashboard snapshot as Prometheus gauges.
+
+    Every scrape reads the last completed snapshots, so scrapes never trigger a
+    fetch or a recomputation of func(). A tenant whose snapshot cannot be built is
+    reported with finance_snapshot_up 0 and skipped, so it cannot blank the others.
+    """
+
+    def __init__(self, snapshots):
+        self.snapshots = snapshots
+
+    def collect(self):
+        self._setup_empty_prometheus_metrics()
+        metrics = self._prometheus_metrics
+        for tenant, snapshot in self.snapshots.items():
+            added = {name: len(metric.samples) for name, metric in metrics.items()}
+            try:
+                self._add_tenant(tenant, *snapshot.get())
+            except Exception:
+                traceback.print_exc()
+                # drop whatever the tenant added before failing
+                for name, count in added.items():
+                    del metrics[name].samples[count:]
+                metrics['up'].add_metric([tenant], 0)
+            else:
+                metrics['up'].add_metric([tenant], 1)
+
+        for metric in self._prometheus_metrics.values():
+            yield metric
+
+    def _add_tenant(self, tenant, payload, age):
+        metrics = self._prometheus_metrics
+
+        total = payload['total']
+        for window, suffix in (('1m', 'LastMonth'), ('3m', 'LastQuarter'), ('12m', 'LastYear')):
+            metrics['income'].add_metric([tenant, window], total['totalIncomeFor' + suffix])
+            metrics['expense'].add_metric([tenant, window], total['totalExpenseFor' + suffix])
+
+        profit = payload['Profit']
+        metrics['profit'].add_metric([tenant, '1m'], profit['monthlyProfit'])
+        metrics['profit'].add_metric([tenant, '3m'], profit['quarterlyProfit'])
+        metrics['profit'].add_metric([tenant, '12m'], profit['yearlyProfit'])
+        metrics['profit'].add_metric([tenant, 'overall'], profit['overallProfit'])
+
+        metrics['runway'].add_metric([tenant], payload['runway']['runway'])
+
+        spending = payload['SpendingCapability']
+        metrics['spending'].add_metric([tenant, '1m'], spending['spendingCapabilitesMonthly'])
+        metrics['spending'].add_metric([tenant, '3m'], spending['spendingCapabilitesQuarterly'])
+        metrics['spending'].add_metric([tenant, '12m'], spending['spendingCapabilitesYearly'])
+
+        for window, name in (('1m', 'month'), ('3m', 'quarter'), ('12m', 'year')):
+            for item in payload['categoryPie'][name]:
+                metrics['category'].add_metric([tenant, window, item['category']], item['value'])
+
+        # profitGraph is oldest first; label each point by how many months back it is
+        points = payload['profitGraph']
+        for position, point in enumerate(points):
+            metrics['monthlyprofit'].add_metric([tenant, str(len(points) - position - 1)], point['value'])
+
+        metrics['age'].add_metric([tenant], age)
+
+    def _setup_empty_prometheus_metrics(self):
+        self._prometheus_metrics = {}
+
+        self._prometheus_metrics['income'] = GaugeMetricFamily('finance_income',
+                                                               'Total income over the trailing window',
+                                                               labels=["tenant", "window"])
+        self._prometheus_metrics['expense'] = GaugeMetricFamily('finance_expense',
+                                                                'Total expense over the trailing window',
+                                                                labels=["tenant", "window"])
+        self._prometheus_metrics['profit'] = GaugeMetricFamily('finance_profit',
+                                                               'Income minus expense over the trailing window',
+                                                               labels=["tenant", "window"])
+        self._prometheus_metrics['runway'] = GaugeMetricFamily('finance_runway_months',
+                                                               'Months of runway at the last year\'s average expense',
+                                                               labels=["tenant"])
+        self._prometheus_metrics['spending'] = GaugeMetricFamily('finance_spending_capability',
+                                                                 'Spending capability over the trailing window',
+                                                                 labels=["tenant", "window"])
+        self._prometheus_metrics['category'] = GaugeMetricFamily('finance_category_amount',
+                                                                 'Amount per category over the trailing window',
+                                                                 labels=["tenant", "window", "category"])
+        self._prometheus_metrics['monthlyprofit'] = GaugeMetricFamily('finance_monthly_profit',
+                                                                      'Net profit of each trailing month',
+                                                                      labels=["tenant", "months_ago"])
+        self._prometheus_metrics['age'] = GaugeMetricFamily('finance_snapshot_age_seconds',
+                                                            'Seconds since the exported snapshot was built',
+                                                            labels=["tenant"])
+        self._prometheus_metrics['up'] = GaugeMetricFamily('finance_snapshot_up',
+                                                           'Whether the tenant\'s snapshot could be built',
+                                                           labels=["tenant"])
@@ -1,12 +1,155 @@
-from flask import Flask, jsonify
+import os
+import sys
+from datetime import date
+from flask import Flask, Response, abort, jsonify, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+
+# modules shared with the other exporters live in ../Common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Common'))
+import graph
+from dataset import DEFAULT_TENANT, tenants
+from downsample import DEFAULT_AGGREGATIONS, METHODS, bucketed, lttb, parseAggregations, parseInterval
+from encoded import Encoded
 from func import func
+from metrics import FinanceCollector
+from snapshot import Snapshot
+from windows import DEFAULT_WINDOWS, GRANULARITIES, MAX_YEARS, aggregate, parseWindows
 
 app = Flask(__name__)
 
+# one snapshot per tenant, rebuilt every FINANCE_REFRESH_INTERVAL seconds from freshly fetched operations
+snapshots = {name: Snapshot(lambda tenant=tenant: func(tenant.loadDataset(fresh=True)))
+             for name, tenant in tenants.items()}
+
+registry = CollectorRegistry()
+registry.register(FinanceCollector(snapshots))
+
+
+def tenantOr404(name):
+    if name not in tenants:
+        abort(404, "unknown tenant " + name)
+    return tenants[name]
+
+
+def positiveArg(name, default=None, maximum=None):
+    """The positive integer query parameter ``name``, ``default`` when absent; aborts with 400 otherwise.
+
+    request.args.get(type=int) would turn a value that does not parse into the
+    default rather than an error.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    if not value.isdecimal() or int(value) < 1:
+        abort(400, "%s must be a positive integer" % name)
+    if maximum is not None and int(value) > maximum:
+        abort(400, "%s must be at most %d" % (name, maximum))
+    return int(value)
+
+
+@app.route('/t/<name>/')
+def tenantMain(name):
+    tenantOr404(name)
+    encoded, age = snapshots[name].getEncoded()
+    return encoded.response(age)
+
+
+@app.route('/t/<name>/refresh', methods=['POST'])
+def tenantRefresh(name):
+    tenantOr404(name)
+    snapshots[name].requestRebuild()
+    return jsonify({'refreshing': True}), 202
+
+
+@app.route('/t/<name>/growth')
+def tenantGrowth(name):
+    # e.g. /growth?months=60 for five years of monthly profit and growth
+    months = positiveArg('months', 12, MAX_YEARS * 12)
+    monthly = tenantOr404(name).loadDataset().monthly
+    return jsonify({
+        'profit': graph.profitSeries(monthly, months),
+        'growth': graph.growthSeries(monthly, months),
+    })
+
+
+@app.route('/t/<name>/windows')
+def tenantWindows(name):
+    # e.g. /windows?windows=1m,3m,12m&granularity=month&categories=1&top=5
+    try:
+        requested = parseWindows(request.args.get('windows', DEFAULT_WINDOWS))
+    except ValueError as error:
+        abort(400, str(error))
+    top = positiveArg('top')
+    granularity = request.args.get('granularity')
+    if granularity and granularity not in GRANULARITIES:
+        abort(400, "granularity must be one of " + ", ".join(GRANULARITIES))
+    categories = request.args.get('categories', '0') not in ('', '0', 'false')
+    # daily series over long windows get large, so these go out gzipped and with an ETag too
+    return Encoded(aggregate(tenantOr404(name).loadDataset(), requested, granularity, categories, top)).response()
+
+
+@app.route('/t/<name>/profit-graph')
+def tenantProfitGraph(name):
+    # e.g. /profit-graph?window=3m&interval=1d&agg=sum,min,max&maxDataPoints=500
+    # or /profit-graph?method=lttb&maxDataPoints=500 for a shape-preserving subset of the operations
+    try:
+        window = parseWindows(request.args.get('window', '1m'))
+        interval = request.args.get('interval')
+        interval = parseInterval(interval) if interval else None
+        aggregations = parseAggregations(request.args.get('agg', DEFAULT_AGGREGATIONS))
+    except ValueError as error:
+        abort(400, str(error))
+    if len(window) != 1:
+        abort(400, "window must be a single window")
+    maxDataPoints = positiveArg('maxDataPoints')
+    method = request.args.get('method', 'bucket')
+    if method not in METHODS:
+        abort(400, "method must be one of " + ", ".join(METHODS))
+    if method == 'lttb' and not maxDataPoints:
+        abort(400, "method=lttb needs maxDataPoints")
+
+    dataset = tenantOr404(name).loadDataset()
+    start = (dataset.today - window[0][1]).toordinal()
+    end = dataset.today.toordinal()
+    points = dataset.ledger.signedValues(start, end)
+    if method == 'lttb':
+        series = [{'date': date.fromordinal(ordinal).isoformat(), 'value': value}
+                  for ordinal, value in lttb(list(points), maxDataPoints)]
+    else:
+        series = bucketed(points, start, end, interval, aggregations, maxDataPoints)
+    return Encoded(series).response()
+
+
+# the un-prefixed routes serve FINANCE_DEFAULT_TENANT
 
 @app.route('/')
 def main():
-    return jsonify(func())
+    return tenantMain(DEFAULT_TENANT)
+
+
+@app.route('/refresh', methods=['POST'])
+def refresh():
+    return tenantRefresh(DEFAULT_TENANT)
+
+
+@app.route('/growth')
+def growth():
+    return tenantGrowth(DEFAULT_TENANT)
+
+
+@app.route('/windows')
+def windows():
+    return tenantWindows(DEFAULT_TENANT)
+
+
+@app.route('/profit-graph')
+def profitGraph():
+    return tenantProfitGraph(DEFAULT_TENANT)
+
+
+@app.route('/metrics')
+def metrics():
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
 
 
 # @app.route('/data')
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+import traceback
+from encoded import Encoded
+
+REFRESH_INTERVAL = int(os.getenv('FINANCE_REFRESH_INTERVAL', '60'))
+
+
+class Snapshot:
+    """Keeps the last payload returned by ``build`` and rebuilds it in the background.
+
+    Readers always get the last completed payload (stale-while-revalidate); only the
+    very first read waits for a build. A failed rebuild keeps the previous payload.
+    Each build is serialized once, so requests only copy out the cached bytes.
+    """
+
+    def __init__(self, build, interval=REFRESH_INTERVAL):
+        self.build = build
+        self.interval = interval
+        self._current = None
+        self._buildLock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.rebuild()
+            except Exception:
+                traceback.print_exc()
+
+    def rebuild(self):
+        with self._buildLock:
+            payload = self.build()
+            encoded = Encoded(payload)
+            # a single reference swap, so readers never see a half-built payload
+            self._current = (payload, encoded, time.time())
+        return self._current
+
+    def requestRebuild(self):
+        self.start()
+        self._wake.set()
+
+    def _latest(self):
+        self.start()
+        current = self._current
+        if current is None:
+            with self._buildLock:
+                current = self._current or self.rebuild()
+        return current
+
+    def get(self):
+        """(payload, age in seconds) of the last completed build."""
+        payload, encoded, builtAt = self._latest()
+        return payload, time.time() - builtAt
+
+    def getEncoded(self):
+        """(Encoded payload, age in seconds) of the last completed build."""
+        payload, encoded, builtAt = self._latest()
+        return encoded, time.time() - builtAt
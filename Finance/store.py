@@ -0,0 +1,157 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from ledger import Ledger
+from main import fetcher
+
+STORE_PATH = os.getenv('FINANCE_STORE')
+# sort order asking Redmine for the most recently changed operations first
+SYNC_SORT = os.getenv('FINANCE_SYNC_SORT', 'updated_at:desc')
+# seconds between full resyncs, which drop operations deleted in Redmine
+RECONCILE_INTERVAL = int(os.getenv('FINANCE_RECONCILE_INTERVAL', '3600'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    id INTEGER PRIMARY KEY,
+    operation_date TEXT,
+    is_income INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS operations_date ON operations (operation_date);
+CREATE TABLE IF NOT EXISTS sync (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def updatedAt(operation):
+    return operation.get("updated_at") or operation.get("updated_on") or ""
+
+
+def row(operation):
+    category = operation.get("category") or {}
+    amount = operation.get("amount")
+    return (operation["id"], operation.get("operation_date"), 1 if operation.get("is_income") == 1 else 0,
+            float(amount) if amount is not None else 0.0, category.get("full_name"), updatedAt(operation))
+
+
+class OperationStore:
+    """Normalized operations kept in SQLite, keyed by id, with a high-water mark.
+
+    ``sync()`` only pulls operations updated since the last sync; ``sync(full=True)``,
+    the first sync of an empty store and any sync ``reconcileInterval`` seconds after
+    the last full one re-download everything, which is also the only way deletions
+    in Redmine are picked up.
+    """
+
+    def __init__(self, path=STORE_PATH, fetcher=fetcher, reconcileInterval=RECONCILE_INTERVAL):
+        self.path = path
+        self.fetcher = fetcher
+        self.reconcileInterval = reconcileInterval
+        self._resyncedAt = time.monotonic()
+        self._warnedUnstamped = False
+        # (id, previous, current) ledger fields of each operation the last sync changed;
+        # None after a full resync
+        self.lastChanges = None
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def highWaterMark(self, connection):
+        found = connection.execute("SELECT value FROM sync WHERE key = 'updated_at'").fetchone()
+        # a store written before unstamped operations were detected may hold ""
+        return found[0] if found and found[0] else None
+
+    def sync(self, full=False):
+        """Bring the store up to date; returns the number of operations written."""
+        full = full or time.monotonic() - self._resyncedAt >= self.reconcileInterval
+        with self.connect() as connection:
+            mark = None if full else self.highWaterMark(connection)
+            operations = None if mark is None else self.changedSince(mark)
+            if operations is None:
+                mark = None
+                rows = self.fetcher.stream(row)
+                connection.execute("DELETE FROM operations")
+                self.lastChanges = None
+                self._resyncedAt = time.monotonic()
+            else:
+                rows = map(row, operations)
+                self.lastChanges = []
+
+            count = 0
+            newMark = mark or ""
+            for values in rows:
+                if self.lastChanges is not None:
+                    previous = connection.execute("SELECT operation_date, is_income, amount, category FROM operations "
+                                                  "WHERE id = ?", (values[0],)).fetchone()
+                    # operations stamped at the mark come back on every sync unchanged
+                    if previous != values[1:5]:
+                        self.lastChanges.append((values[0], previous, values[1:5]))
+                connection.execute("INSERT OR REPLACE INTO operations VALUES (?, ?, ?, ?, ?, ?)", values)
+                count = count + 1
+                newMark = max(newMark, values[5])
+            if newMark:
+                connection.execute("INSERT OR REPLACE INTO sync VALUES ('updated_at', ?)", (newMark,))
+            else:
+                # without stamps there is nothing to cut off at, so the next sync is a full one again
+                connection.execute("DELETE FROM sync WHERE key = 'updated_at'")
+                if count and not self._warnedUnstamped:
+                    self._warnedUnstamped = True
+                    print("operations carry no updated_at or updated_on; incremental sync is unavailable",
+                          file=sys.stderr)
+        return count
+
+    def changedSince(self, mark):
+        """Operations updated at or after ``mark``, newest first.
+
+        Returns None when Redmine ignores the sort order, since the pages then
+        cannot be cut off early and a full resync is needed instead.
+        """
+        changed = []
+        offset = 0
+        while True:
+            page = self.fetcher.fetchPage(offset, params={'sort': SYNC_SORT})
+            operations = page.get("operations", [])
+            stamps = [updatedAt(operation) for operation in operations]
+            if stamps != sorted(stamps, reverse=True):
+                return None
+            for operation, stamp in zip(operations, stamps):
+                if stamp < mark:
+                    return changed
+                changed.append(operation)
+            offset = offset + len(operations)
+            if not operations or offset >= page.get("total_count", 0):
+                return changed
+
+    def ledger(self):
+        ledger = Ledger()
+        with self.connect() as connection:
+            # same order as the operations.json pages: newest first
+            for operationId, operationDate, isIncome, amount, category in connection.execute(
+                    "SELECT id, operation_date, is_income, amount, category FROM operations "
+                    "ORDER BY operation_date DESC, id DESC"):
+                ledger.append(operationDate, isIncome, amount, category, operationId)
+        return ledger
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sync Redmine finance operations into the local store")
+    parser.add_argument("--path", default=STORE_PATH or "operations.sqlite3")
+    parser.add_argument("--full", action="store_true", help="discard the store and resync the whole history")
+    args = parser.parse_args()
+
+    print("%d operations synced" % OperationStore(args.path).sync(full=args.full))
@@ -0,0 +1,90 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+class _Buffer:
+    """Text decoded from a byte-chunk iterator, read on demand."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.position = 0
+        self.exhausted = False
+
+    def more(self):
+        if self.exhausted:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            self.text = self.text[self.position:] + self.decoder.decode(b"", final=True)
+        else:
+            self.text = self.text[self.position:] + self.decoder.decode(chunk)
+        self.position = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, or '' at the end of the stream."""
+        while True:
+            while self.position < len(self.text) and self.text[self.position] in _whitespace:
+                self.position += 1
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.more():
+                return ""
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError("expected %r in JSON stream" % character)
+        self.position += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.position)
+                # a number at the very end of the buffer may continue in the next chunk
+                if end < len(self.text) or self.exhausted:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+            self.more()
+
+
+def iterArray(chunks, key, fields):
+    """Stream the elements of the top-level ``key`` array of a JSON object.
+
+    Yields each element only long enough for it to be passed to ``fields``; the
+    other top-level members (``total_count`` and friends) are collected into the
+    dict returned as the generator's value.
+    """
+    buffer = _Buffer(chunks)
+    members = {}
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return members
+    while True:
+        name = buffer.value()
+        buffer.expect(":")
+        if name == key and buffer.peek() == "[":
+            buffer.expect("[")
+            if buffer.peek() != "]":
+                while True:
+                    yield fields(buffer.value())
+                    if buffer.peek() != ",":
+                        break
+                    buffer.expect(",")
+            buffer.expect("]")
+        else:
+            members[name] = buffer.value()
+        if buffer.peek() != ",":
+            break
+        buffer.expect(",")
+    buffer.expect("}")
+    return members
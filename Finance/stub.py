@@ -0,0 +1,135 @@
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CATEGORIES = ["misllaneous", "salary", "office maintenance"]
+
+
+def parseCategoryMix(spec):
+    """'salary=3,rent=1,travel' -> (["salary", "rent", "travel"], [3.0, 1.0, 1.0])"""
+    names = []
+    weights = []
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        names.append(name.strip())
+        weights.append(float(weight) if weight else 1.0)
+    return names, weights
+
+
+def syntheticOperations(count, days=730, categories=CATEGORIES, seed=0, weights=None, incomeRatio=0.5):
+    """Fake Redmine finance operations, newest first like the real endpoint.
+
+    Dates are spread uniformly over the last ``days`` days and categories are drawn
+    from ``categories`` with the optional relative ``weights``.
+    """
+    rnd = random.Random(seed)
+    today = date.today()
+    codes = {category: code + 1 for code, category in enumerate(categories)}
+    drawn = rnd.choices(categories, weights, k=count)
+    operations = []
+    for i, category in enumerate(drawn):
+        operations.append({
+            "id": i + 1,
+            "operation_date": str(today - timedelta(days=rnd.randrange(days))) + " 00:00:00 UTC",
+            "amount": "%.2f" % rnd.uniform(1, 5000),
+            "currency": "USD",
+            "description": "synthetic operation %d" % (i + 1),
+            "is_income": 1 if rnd.random() < incomeRatio else 0,
+            "category": {"id": codes[category], "name": category, "full_name": category},
+        })
+        operations[-1]["updated_at"] = operations[-1]["operation_date"][:10] + "T00:00:00Z"
+    operations.sort(key=lambda operation: operation["operation_date"], reverse=True)
+    return operations
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, operations, latency=0.0, maxLimit=100):
+        super().__init__(address, StubHandler)
+        self.operations = operations
+        self.latency = latency
+        self.maxLimit = maxLimit
+        self.requestCount = 0
+        self._countLock = threading.Lock()
+
+    @property
+    def url(self):
+        return "http://%s:%d" % self.server_address[:2]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/stats":
+            self.sendJson({"requests": self.server.requestCount})
+            return
+        with self.server._countLock:
+            self.server.requestCount += 1
+        if parsed.path != "/operations.json":
+            self.send_error(404)
+            return
+        query = parse_qs(parsed.query)
+        # like Redmine: default 25 rows, ``page`` may carry junk such as "2.json"
+        limit = min(int(query.get("limit", ["25"])[0]), self.server.maxLimit)
+        if "offset" in query:
+            offset = int(query["offset"][0])
+        else:
+            offset = (int(query.get("page", ["1"])[0].split(".")[0]) - 1) * limit
+
+        operations = self.server.operations
+        if query.get("sort") == ["updated_at:desc"]:
+            operations = sorted(operations, key=lambda operation: operation["updated_at"], reverse=True)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.sendJson({
+            "operations": operations[offset:offset + limit],
+            "total_count": len(self.server.operations),
+            "offset": offset,
+            "limit": limit,
+        })
+
+    def sendJson(self, content):
+        body = json.dumps(content).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(operations, port=0, latency=0.0):
+    """Start a stub Redmine on a background thread and return the server."""
+    server = StubServer(("127.0.0.1", port), operations, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve synthetic operations.json pages like a local Redmine")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=730, help="date span of the ledger")
+    parser.add_argument("--categories", default=",".join(CATEGORIES),
+                        help="category mix, e.g. salary=3,rent=1,travel")
+    parser.add_argument("--income-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to sleep per request")
+    args = parser.parse_args()
+
+    categories, weights = parseCategoryMix(args.categories)
+    operations = syntheticOperations(args.count, args.days, categories, args.seed, weights, args.income_ratio)
+    server = StubServer(("127.0.0.1", args.port), operations, args.latency)
+    print("Serving %d operations at %s" % (args.count, server.url))
+    server.serve_forever()
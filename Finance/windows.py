@@ -0,0 +1,107 @@
+import re
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+
+UNITS = {
+    'd': lambda n: relativedelta(days=+n),
+    'w': lambda n: relativedelta(weeks=+n),
+    'm': lambda n: relativedelta(months=+n),
+    'q': lambda n: relativedelta(months=+3 * n),
+    'y': lambda n: relativedelta(years=+n),
+}
+# windows reach back at most MAX_YEARS, so their start always stays a valid date
+MAX_YEARS = 100
+MAX_COUNTS = {'d': MAX_YEARS * 366, 'w': MAX_YEARS * 53, 'm': MAX_YEARS * 12, 'q': MAX_YEARS * 4, 'y': MAX_YEARS}
+GRANULARITIES = ['day', 'week', 'month', 'quarter', 'year']
+DEFAULT_WINDOWS = '1m,3m,12m'
+
+_windowPattern = re.compile(r'^(\d+)([dwmqy])$')
+
+
+def parseWindows(specs):
+    """'1m,3m,12m' -> [('1m', relativedelta(months=+1)), ...]; raises ValueError."""
+    windows = []
+    for spec in specs.split(','):
+        spec = spec.strip().lower()
+        match = _windowPattern.match(spec)
+        if not match or int(match.group(1)) == 0:
+            raise ValueError("invalid window %r, expected e.g. 7d, 2w, 3m, 1q or 1y" % spec)
+        if int(match.group(1)) > MAX_COUNTS[match.group(2)]:
+            raise ValueError("window %r is longer than %d years" % (spec, MAX_YEARS))
+        windows.append((spec, UNITS[match.group(2)](int(match.group(1)))))
+    return windows
+
+
+def periodStart(day, granularity):
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return day.replace(month=day.month - (day.month - 1) % 3, day=1)
+    return day.replace(month=1, day=1)
+
+
+def periodStep(granularity):
+    return {
+        'day': relativedelta(days=+1),
+        'week': relativedelta(weeks=+1),
+        'month': relativedelta(months=+1),
+        'quarter': relativedelta(months=+3),
+        'year': relativedelta(years=+1),
+    }[granularity]
+
+
+def series(index, start, end, granularity):
+    """Calendar-aligned buckets of ``granularity`` covering start..end, clipped to it."""
+    points = []
+    step = periodStep(granularity)
+    bucket = periodStart(start, granularity)
+    while bucket <= end:
+        following = bucket + step
+        income, expense = index.totals(max(bucket, start).toordinal(), min(following - timedelta(days=1), end).toordinal())
+        points.append({
+            'date': str(bucket),
+            'income': income,
+            'expense': expense,
+            'value': income - expense,
+        })
+        bucket = following
+    return points
+
+
+def aggregate(dataset, windows, granularity=None, categories=False, top=None):
+    """Totals, and optionally a bucketed series and category breakdown, for each
+    trailing window ending today.
+
+    Every window shares the ledger's date index, so each total or bucket costs two
+    binary searches regardless of ledger size; category breakdowns share one pass
+    over the widest window.
+    """
+    ledger = dataset.ledger
+    index = ledger.index
+    today = dataset.today
+    starts = [today - length for spec, length in windows]
+    if categories:
+        categorySums = ledger.windowTotals([start.toordinal() for start in starts], today.toordinal())[2]
+    result = []
+    for position, (spec, length) in enumerate(windows):
+        start = starts[position]
+        income, expense = index.totals(start.toordinal(), today.toordinal())
+        window = {
+            'window': spec,
+            'from': str(start),
+            'to': str(today),
+            'income': income,
+            'expense': expense,
+            'profit': income - expense,
+        }
+        if granularity:
+            window['granularity'] = granularity
+            window['series'] = series(index, start, today, granularity)
+        if categories:
+            window['categories'] = ledger.categoryBreakdown(categorySums[position], top)
+        result.append(window)
+    return result
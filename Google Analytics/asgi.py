@@ -0,0 +1,18 @@
+import os
+import sys
+from endpoint import app as flaskApp
+
+# modules shared with the other exporters live in ../Common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Common'))
+from asgibridge import CoalescingBridge
+
+# ASGI entry point: ``uvicorn asgi:app``. Concurrent requests for the same path, query and
+# varying headers share one in-flight report, so a dashboard refresh costs one round of
+# GA4 API calls however many panels ask.
+app = CoalescingBridge(flaskApp, int(os.getenv('GA_ASGI_WORKERS', '4')))
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='127.0.0.1', port=int(os.getenv('PORT', '5000')))
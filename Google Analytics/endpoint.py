@@ -1,13 +1,37 @@
-from flask import Flask, jsonify
+import os
+import sys
+import threading
+import time
+
+from flask import Flask
 
 from tests import check
 
+# modules shared with the other exporters live in ../Common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Common'))
+from encoded import Encoded
+
 app = Flask(__name__)
 
+# seconds a report is served from memory before the GA4 API is queried again
+CACHE_TTL = int(os.getenv('GA_CACHE_TTL', '60'))
+
+cache = {'report': None, 'builtAt': 0}
+cacheLock = threading.Lock()
+
+
+def encodedReport():
+    """The last check() as an Encoded payload, rebuilt at most every CACHE_TTL seconds."""
+    with cacheLock:
+        if cache['report'] is None or time.time() - cache['builtAt'] >= CACHE_TTL:
+            cache['report'] = Encoded(check())
+            cache['builtAt'] = time.time()
+        return cache['report']
+
 
 @app.route('/')
 def main():
-    return jsonify(check())
+    return encodedReport().response()
 
 
 if __name__ == '__main__':
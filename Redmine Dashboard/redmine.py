@@ -1,196 +1,473 @@
 import datetime
+import importlib.util
+import json
 import time
 import os
+import zlib
+import threading
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
 from sys import exit
-from prometheus_client import start_http_server, Summary
+from urllib.parse import urlsplit
+from prometheus_client import make_wsgi_app, Summary
 from prometheus_client.core import GaugeMetricFamily, REGISTRY
 from redminelib import Redmine
+from redminelib.engines.sync import SyncEngine
 from dotenv import load_dotenv
 
-import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.wrappers import Request, Response
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml parses the issue pages faster when it is installed; BeautifulSoup loads it itself
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
 
 load_dotenv()
 
 COLLECTION_TIME = Summary('redmine_collector_collect_seconds', 'Time spent to collect metrics from Redmine')
 final_ids = []
 
+# per-status issue counts exported for every project, by Redmine issue status id
+STATUS_COUNTS = {'resolvedissues': 3, 'onholdissues': 10, 'inprogressissues': 2, 'feedbackissues': 4}
+
+# Sections of the collector refreshed independently in the background, and the metrics each one produces
+SECTIONS = {
+    'global': ['todaydate', 'activeusers', 'duedate'],
+    'meetings': ['meeting'],
+    'spenttime': ['spent7days', 'spenttime', 'spenttimeproject', 'spenttimeactivity'],
+    'projects': ['openissues', 'issuecolor', 'closedissues'] + list(STATUS_COUNTS),
+}
+# Custom fields holding a meeting's date and time; the date field may also hold "date time"
+MEETING_DATE_FIELD = os.getenv('MEETING_DATE_FIELD', 'Meeting date')
+MEETING_TIME_FIELD = os.getenv('MEETING_TIME_FIELD', 'Meeting time')
+# format of the exported date label, as on the issue page; the API returns date custom fields as ISO dates
+MEETING_DATE_FORMAT = '%m/%d/%Y'
+
+# Trailing windows, in days, of the spent-time metrics; all of them cost one ranged time entry query
+SPENT_TIME_WINDOWS = [int(days) for days in os.getenv('SPENT_TIME_WINDOWS', '7,30,90').split(',')]
+# Optional spent-time breakdowns besides the per-user one: project, activity
+SPENT_TIME_BREAKDOWNS = [name for name in os.getenv('SPENT_TIME_BREAKDOWNS', '').split(',') if name]
+
+# Seconds between refreshes of a section; REFRESH_INTERVAL_<SECTION> (e.g. REFRESH_INTERVAL_MEETINGS) overrides it
+REFRESH_INTERVAL = int(os.getenv('REFRESH_INTERVAL', '60'))
+# Seconds between full issue pulls; refreshes in between only fetch issues updated since the last one
+RECONCILE_INTERVAL = int(os.getenv('RECONCILE_INTERVAL', '3600'))
+# Threads fetching the pages of a listing in parallel, over one pooled keep-alive session
+WORKERS = int(os.getenv('WORKERS', '8'))
+# Requests in flight to one Redmine host at a time
+HOST_CONCURRENCY = int(os.getenv('HOST_CONCURRENCY', '4'))
+# Seconds a refresh pass may take; sections still running then are reported via redmine_scrape_partial
+SCRAPE_DEADLINE = float(os.getenv('SCRAPE_DEADLINE', '30'))
+
+# Labels of the per-issue metrics. With CARDINALITY_MODE=aggregated they are replaced by
+# counts over an allowlisted subset of these labels, and the rows are served as JSON under /details/
+DETAIL_LABELS = {
+    'duedate': ["projectname", "issueid", "status", "tracker", "priority", "duedate", "author", "user"],
+    'meeting': ["status", "watchers", "subject", "time", "date"],
+}
+CARDINALITY_MODE = os.getenv('CARDINALITY_MODE', 'full')
+LABEL_ALLOWLISTS = {
+    'duedate': os.getenv('DUEDATE_LABELS', 'projectname,status,tracker,priority').split(','),
+    'meeting': os.getenv('MEETING_LABELS', 'status,date').split(','),
+}
+# Labels whose values grow without bound; when allowlisted their values are hashed into LABEL_BUCKETS buckets
+UNBOUNDED_LABELS = {'issueid', 'author', 'user', 'watchers', 'subject'}
+LABEL_BUCKETS = int(os.getenv('LABEL_BUCKETS', '16'))
+# Most series exported per metric; the rest are dropped (full) or folded into an "other" series (aggregated)
+MAX_SERIES = int(os.getenv('MAX_SERIES', '500'))
+DETAIL_PATHS = {'/details/duedate': 'duedate', '/details/meetings': 'meeting'}
+
+page_pool = ThreadPoolExecutor(max_workers=WORKERS)
+host_slots = {}
+host_slots_lock = threading.Lock()
+
+
+def host_slot(url):
+    # Semaphore bounding the concurrent requests to the host of ``url``
+    host = urlsplit(url).netloc
+    with host_slots_lock:
+        if host not in host_slots:
+            host_slots[host] = threading.BoundedSemaphore(HOST_CONCURRENCY)
+        return host_slots[host]
+
+
+def label_value(label, value):
+    value = value if isinstance(value, str) else str(value)
+    if CARDINALITY_MODE == 'aggregated' and label in UNBOUNDED_LABELS:
+        return 'bucket%02d' % (zlib.crc32(value.encode('utf-8')) % LABEL_BUCKETS)
+    return value
+
+
+def aggregated_series(rows, labels):
+    # Number of rows per combination of ``labels``, at most MAX_SERIES series, and how many were folded away
+    counts = Counter(tuple(label_value(label, row[label]) for label in labels) for row in rows)
+    series = counts.most_common()
+    if len(series) <= MAX_SERIES:
+        return series, 0
+    other = sum(count for values, count in series[MAX_SERIES - 1:])
+    return series[:MAX_SERIES - 1] + [(tuple('other' for label in labels), other)], len(series) - MAX_SERIES + 1
+
+
+def parse_meeting_date(value):
+    # date of a meeting date field in ISO or MEETING_DATE_FORMAT form, or None if it is neither
+    for date_format in ('%Y-%m-%d', MEETING_DATE_FORMAT):
+        try:
+            return datetime.datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    return None
+
+
+class PooledEngine(SyncEngine):
+    """python-redmine engine sharing one keep-alive session across threads.
+
+    The remaining pages of a listing are fetched in parallel on ``page_pool``;
+    every request waits for a slot of its host first.
+    """
+
+    @staticmethod
+    def create_session(**params):
+        session = SyncEngine.create_session(**params)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WORKERS)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def request(self, method, url, headers=None, params=None, data=None):
+        kwargs = self.construct_request_kwargs(method, headers, params, data)
+        # a Session ignores a timeout attribute, so it has to go with every request
+        with host_slot(url):
+            return self.process_response(self.session.request(method, url, timeout=SCRAPE_DEADLINE, **kwargs))
+
+    def process_bulk_request(self, method, url, container, bulk_params):
+        pages = page_pool.map(lambda params: self.request(method, url, params=params)[container], bulk_params)
+        return [resource for page in pages for resource in page]
+
+
+class IssueCache(object):
+    """Project and status of every issue, keyed by issue id.
+
+    After the first full pull only issues updated since the newest ``updated_on``
+    seen are requested and merged in, keeping the per (project, status) counts
+    current without re-reading unchanged issues. Deletions leave no trace in
+    ``updated_on``, so a full pull replaces the cache every ``reconcile_interval``
+    seconds.
+    """
+
+    def __init__(self, reconcile_interval=RECONCILE_INTERVAL):
+        self.reconcile_interval = reconcile_interval
+        self.issues = {}
+        self.counts = Counter()
+        self.synced_on = None
+        self.reconciled_at = 0
+
+    def sync(self, redmine):
+        full = self.synced_on is None or time.time() - self.reconciled_at >= self.reconcile_interval
+        if full:
+            issues, counts, params = {}, Counter(), {}
+        else:
+            # >= rather than >: issues updated within the same second as the mark are merged again, harmlessly
+            issues, counts, params = self.issues, self.counts, {'updated_on': '>=' + self.synced_on}
+        synced_on = None if full else self.synced_on
+
+        for issue in redmine.issue.filter(status_id='*', **params).values('id', 'project', 'status', 'updated_on'):
+            key = (issue['project']['id'], issue['status']['id'])
+            previous = issues.get(issue['id'])
+            if previous is not None:
+                counts[previous] -= 1
+            issues[issue['id']] = key
+            counts[key] += 1
+            if synced_on is None or issue['updated_on'] > synced_on:
+                synced_on = issue['updated_on']
+
+        if full:
+            self.issues, self.counts = issues, counts
+            self.reconciled_at = time.time()
+        # Redmine's own timestamps, so the exporter's clock never matters
+        self.synced_on = synced_on
 
-class RedmineCollector(object):
-    apimetrics = ["redmine_project_open_issues_total_count", "redmine_project_closed_issues_total_count",
-                  "redmine_project_resolved_issues_total_count", "redmine_project_onhold_issues_total_count",
-                  "redmine_project_inprogress_issues_total_count", "redmine_project_feedback_issues_total_count",
-                  "redmine_project_activeusers_count", "redmine_project_issue_due_date",
-                  "redmine_project_open_issues_color_total_count",
-                  "redmine_project_open_meeting_total_count","redmine_project_issue_spenttime_last_week_hours"
-                  ]
 
+class RedmineCollector(object):
     def __init__(self, target, api):
         self._target = target.rstrip("/")
         self.api = api
+        self._intervals = {section: int(os.getenv('REFRESH_INTERVAL_' + section.upper(), REFRESH_INTERVAL))
+                           for section in SECTIONS}
+        # section -> (metric families, refreshed at, refresh duration) of its last successful refresh
+        self._snapshots = {}
+        self._users = None
+        self._thread = None
+        self._partial = False
+        # detail rows behind the per-issue metrics, and how many series each metric dropped
+        self._details = dict.fromkeys(DETAIL_LABELS, [])
+        self._dropped = dict.fromkeys(DETAIL_LABELS, 0)
+        self._refresh_locks = {section: threading.Lock() for section in SECTIONS}
+        # each section refreshes on its own thread and builds its metric families there
+        self._local = threading.local()
+        self._sections = ThreadPoolExecutor(max_workers=len(SECTIONS))
+        self._redmine = Redmine(self._target, key=api, engine=PooledEngine)
+        # meeting issue id -> (updated_on, watchers, date, time), so unchanged meetings are not read again
+        self._meetings = {}
+        self._issues = IssueCache()
+
+    @property
+    def _prometheus_metrics(self):
+        return self._local.metrics
+
+    @_prometheus_metrics.setter
+    def _prometheus_metrics(self, metrics):
+        self._local.metrics = metrics
 
     def collect(self):
-        start = time.time()
-        self._setup_empty_prometheus_metrics()
-        # Request data from Redmine
-        jobs = self._request_data()
-
-        for status in self.apimetrics:
-            for metric in self._prometheus_metrics.values():
+        # Scrapes only read the last snapshots; all Redmine requests happen in the poller thread
+        self.start()
+        age = GaugeMetricFamily('redmine_snapshot_age_seconds',
+                                'Seconds since the section was last refreshed from Redmine',
+                                labels=["section"])
+        duration = GaugeMetricFamily('redmine_refresh_duration_seconds',
+                                     'Seconds the last refresh of the section took',
+                                     labels=["section"])
+        now = time.time()
+        for section, (metrics, refreshed, took) in list(self._snapshots.items()):
+            for metric in metrics:
                 yield metric
-
-        duration = time.time() - start
-
-        COLLECTION_TIME.observe(duration)
-
-    def _request_data(self):
-        # Request exactly the information we need from Redmine
-        redmine = Redmine(self._target, key=self.api)
-
-        # Watchers field infromation
-
-
-
-
-        for project in redmine.project.all():
-
-            count = len(redmine.issue.filter(tracker_id=4))
-
-            for issue in redmine.issue.filter(tracker_id=4):
-
-                if (issue.tracker.name == 'meeting'):
-                    watching = []
-                    for watcher in issue.watchers:
-                        watching.append(str(watcher))
-
-                    ids = issue.id
-
-                    # Date and Time field infromation used BeautifulSoup for web scraping
-
-                    api_endpoint = os.getenv('URL')+"issues/" + str(ids)
-                    CAT_API_KEY = os.getenv('API')
-
-                    headers = {
-                        "X-Redmine-API-Key": CAT_API_KEY
-                    }
-                    response = requests.get(
-                        api_endpoint,
-                        headers=headers
-                    )
-
-                    htmlContent = response.content
-
-                    soup = BeautifulSoup(htmlContent, 'html.parser')
-
-                    list1 = soup.find('div', class_="attributes")
-
-                    list2 = list1.find('div', class_="meeting-date attribute")
-                    list3 = list2.find('div', class_="value").text
-
-                    s = str(list3)
-                    s1 = s.replace("\n", " ")
-                    s2 = s1.strip()
-                    s3 = s2.replace("     ", "")
-                    check = 0
-                    ans = ""
-                    for itr in s3:
-                        if (itr == ' '):
-                            check = 1
-                        if (check == 1):
-                            ans += itr
-                    final_date = ""
-                    for itr2 in s3:
-                        if (itr2 == ' '):
-                            break
-                        final_date += itr2
-                    # Meeting issue for today and upcoming meeting
-                    today_date = str(datetime.datetime.now().date())
-                    today_date1 = today_date.replace("-", "/")
-
-                    year = ""
-                    month = ""
-                    day = ""
-                    year_count = 4
-                    month_count = 7
-                    count = 0
-                    for itr in today_date1:
-                        if count < year_count:
-                            year += itr
-                        if count > year_count and count < month_count:
-                            month += itr
-                        if count > month_count:
-                            day += itr
-                        count = count + 1
-
-                    today_date_final = month + "/" + day + "/" + year
-                    final_time = ans.replace(" ", "")
-                    if today_date_final <= final_date:
-                        self._prometheus_metrics['meeting'].add_metric(
-                            [issue.status.name, str(watching), str(issue.subject), final_time, final_date], count)
-
-            _date = datetime.datetime.now().date()
-            _datetimestamp = time.mktime(_date.timetuple())
-            self._prometheus_metrics['todaydate'].add_metric([_date.strftime("%m/%d/%Y")], _datetimestamp)
-
-            user = len(redmine.user.all())
-            self._prometheus_metrics['activeusers'].add_metric(['activeusers'], user)
-
-            count = len(redmine.issue.filter(status_id='open', project_id=project.id))
-            self._prometheus_metrics['openissues'].add_metric([project.name], count)
+            age.add_metric([section], now - refreshed)
+            duration.add_metric([section], took)
+        yield age
+        yield duration
+        partial = GaugeMetricFamily('redmine_scrape_partial',
+                                    '1 if sections missed the scrape deadline or failed in the last refresh pass')
+        partial.add_metric([], 1 if self._partial else 0)
+        yield partial
+        dropped = GaugeMetricFamily('redmine_series_dropped',
+                                    'Series of the metric dropped or folded into "other" by the MAX_SERIES cap',
+                                    labels=["metric"])
+        for metric, count in self._dropped.items():
+            dropped.add_metric([metric], count)
+        yield dropped
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+
+    def _poll(self):
+        due = dict.fromkeys(SECTIONS, 0)
+        running = {}
+        while True:
+            for section, future in list(running.items()):
+                if future.done():
+                    del running[section]
+                    due[section] = time.time() + self._intervals[section]
+            started = [section for section in SECTIONS if section not in running and due[section] <= time.time()]
+            for section in started:
+                running[section] = self._sections.submit(self.refresh, section)
+            if started:
+                # Sections still running at the deadline keep serving their previous snapshot
+                # and publish theirs whenever they finish
+                done, late = wait(list(running.values()), timeout=SCRAPE_DEADLINE)
+                self._partial = bool(late) or not all(future.result() for future in done)
+                continue
+            idle = [due[section] for section in SECTIONS if section not in running]
+            wake = min(idle) if idle else time.time() + 1
+            if running:
+                # look in on late sections at least every second
+                wake = min(wake, time.time() + 1)
+            time.sleep(max(0, wake - time.time()))
+
+    def refresh(self, section):
+        # Rebuild one section's metrics; a failed refresh keeps the previous snapshot
+        with self._refresh_locks[section]:
+            start = time.time()
+            self._setup_empty_prometheus_metrics()
+            try:
+                getattr(self, '_collect_' + section)(self._redmine)
+            except Exception:
+                traceback.print_exc()
+                return False
+            duration = time.time() - start
+            COLLECTION_TIME.observe(duration)
+            self._snapshots[section] = ([self._prometheus_metrics[name] for name in SECTIONS[section]],
+                                        time.time(), duration)
+            return True
+
+    def _collect_global(self, redmine):
+        _date = datetime.datetime.now().date()
+        _datetimestamp = time.mktime(_date.timetuple())
+        self._prometheus_metrics['todaydate'].add_metric([_date.strftime("%m/%d/%Y")], _datetimestamp)
+
+        user = len(redmine.user.all())
+        self._users = user
+        self._prometheus_metrics['activeusers'].add_metric(['activeusers'], user)
+
+        rows = []
+        for issue in redmine.issue.all(due_date=_date).values():
+            rows.append({
+                'projectname': issue['project']['name'],
+                'issueid': str(issue['id']),
+                'status': issue['status']['name'],
+                'tracker': issue['tracker']['name'],
+                'priority': issue['priority']['name'],
+                'duedate': _date.strftime('%d/%m/%Y'),
+                'author': issue['author']['name'],
+                'user': issue.get('assigned_to', {}).get('name', ''),
+            })
+        self._export_details('duedate', rows, _datetimestamp)
+
+    def _collect_meetings(self, redmine):
+        # One paged listing of the open meetings, watchers included; date and time come from custom fields
+        meetings = [issue for issue in redmine.issue.filter(tracker_id=4, include=['watchers']).values()
+                    if issue['tracker']['name'] == 'meeting']
+        today = datetime.datetime.now().date()
+
+        changed = [issue for issue in meetings
+                   if issue['id'] not in self._meetings or self._meetings[issue['id']][0] != issue['updated_on']]
+        # details of changed meetings may each need a request, so they are read in parallel
+        for issue, details in zip(changed, page_pool.map(lambda issue: self._meeting_details(redmine, issue), changed)):
+            self._meetings[issue['id']] = (issue['updated_on'],) + details
+
+        rows = []
+        seen = set()
+        for issue in meetings:
+            seen.add(issue['id'])
+            updated_on, watching, final_date, final_time = self._meetings[issue['id']]
+
+            # Meeting issue for today and upcoming meeting; a date that does not parse is never upcoming
+            meeting_day = parse_meeting_date(final_date)
+            if meeting_day is not None and meeting_day >= today:
+                rows.append({'id': issue['id'], 'status': issue['status']['name'], 'watchers': watching,
+                             'subject': str(issue['subject']), 'time': final_time,
+                             'date': meeting_day.strftime(MEETING_DATE_FORMAT)})
+        self._export_details('meeting', rows, len(meetings))
+
+        # forget meetings that were closed or deleted
+        for issue_id in set(self._meetings) - seen:
+            del self._meetings[issue_id]
+
+    def _export_details(self, metric, rows, value):
+        # Per-row series in full mode, allowlisted counts in aggregated mode; the rows themselves go to /details/
+        family = self._prometheus_metrics[metric]
+        if CARDINALITY_MODE == 'aggregated':
+            series, self._dropped[metric] = aggregated_series(rows, LABEL_ALLOWLISTS[metric])
+            for values, count in series:
+                family.add_metric(list(values), count)
+        else:
+            for row in rows[:MAX_SERIES]:
+                family.add_metric([str(row[label]) for label in DETAIL_LABELS[metric]], value)
+            self._dropped[metric] = max(0, len(rows) - MAX_SERIES)
+        self._details[metric] = rows
+
+    def details(self, metric, offset, limit):
+        # One page of a metric's detail rows, paged like the Redmine API
+        rows = self._details[metric]
+        return {'total_count': len(rows), 'offset': offset, 'limit': limit, 'rows': rows[offset:offset + limit]}
+
+    def _meeting_details(self, redmine, issue):
+        # (watchers, date, time) of a meeting whose updated_on changed since it was last read
+        if 'watchers' not in issue:
+            # older Redmine versions only include watchers when showing a single issue
+            issue = redmine.issue.get(issue['id'], include=['watchers']).raw()
+        watching = [watcher['name'] for watcher in issue.get('watchers', [])]
+
+        fields = {field['name']: field.get('value') for field in issue.get('custom_fields', [])}
+        final_date = fields.get(MEETING_DATE_FIELD) or ''
+        final_time = fields.get(MEETING_TIME_FIELD) or ''
+        if ' ' in final_date.strip():
+            # a single field holding "date time"
+            final_date, final_time = final_date.split(None, 1)
+        if not final_date:
+            final_date, final_time = self._scrape_meeting_date(issue['id'])
+        return watching, final_date, final_time.replace(" ", "")
+
+    def _scrape_meeting_date(self, issue_id):
+        # Fallback for instances that do not expose the meeting date through the API:
+        # read it from the issue page, parsing only its attributes block
+        url = self._target + "/issues/" + str(issue_id)
+        with host_slot(url):
+            response = self._redmine.engine.session.get(url, timeout=SCRAPE_DEADLINE)
+        soup = BeautifulSoup(response.content, HTML_PARSER, parse_only=SoupStrainer('div', class_="attributes"))
+        try:
+            value = soup.find('div', class_="meeting-date attribute").find('div', class_="value").text
+            parts = value.split()
+            return parts[0], "".join(parts[1:])
+        except (AttributeError, IndexError):
+            # a page without a meeting date only drops this meeting, not the whole section
+            return '', ''
+
+    def _collect_projects(self, redmine):
+        # The open-issue colour is relative to the user count from the global section
+        users = self._users if self._users is not None else len(redmine.user.all())
+        projects = list(redmine.project.all())
+        issue_counts = self._issue_counts(redmine, projects)
+        for project in projects:
+            self._collect_project(project, issue_counts[project.id], users)
+
+    def _collect_project(self, project, counts, user):
+        count = counts['openissues']
+        self._prometheus_metrics['openissues'].add_metric([project.name], count)
+        color = 'green'
+
+        if count < user * 2:
             color = 'green'
-
-            if count < user * 2:
-                color = 'green'
-            elif count >= user * 2 and count < user * 3:
-                color = 'yellow'
-            elif count >= user * 3:
-                color = 'red'
-            for issue in redmine.issue.all(itr=count):
-                self._prometheus_metrics['issuecolor'].add_metric([issue.project.name, color], count)
-                break
-            count = len(redmine.issue.filter(status_id=3, project_id=project.id))
-            self._prometheus_metrics['resolvedissues'].add_metric([project.name], count)
-            count = len(redmine.issue.filter(status_id='closed', project_id=project.id))
-            self._prometheus_metrics['closedissues'].add_metric([project.name], count)
-            count = len(redmine.issue.filter(status_id=10, project_id=project.id))
-            self._prometheus_metrics['onholdissues'].add_metric([project.name], count)
-            count = len(redmine.issue.filter(status_id=2, project_id=project.id))
-            self._prometheus_metrics['inprogressissues'].add_metric([project.name], count)
-            count = len(redmine.issue.filter(status_id=4, project_id=project.id))
-            self._prometheus_metrics['feedbackissues'].add_metric([project.name], count)
-
-            for issue in redmine.issue.all(due_date=_date):
-                self._prometheus_metrics['duedate'].add_metric(
-                    [issue.project.name, str(issue.id), issue.status.name, issue.tracker.name, issue.priority.name,
-                    _date.strftime('%d/%m/%Y'), issue.author.name, issue.assigned_to.name], _datetimestamp)
-            # spent time start
-            week = []
-            for i in range(0, 7):
-                week.append(((datetime.datetime.now() - datetime.timedelta(days=i)).date()))
-
-            mp = {}
-            for day in week:
-                time_entries = redmine.time_entry.filter(spent_on=day)
-
-                users_name=[]
-
-                for entries in time_entries:
-                    if entries.user.name not in users_name:
-                        users_name.append(entries.user.name)
-                users_name_length=len(users_name)
-
-                for entries in time_entries:
-
-                    if entries.user.name in mp:
-                        mp[entries.user.name] += entries.hours
-
-                    else:
-                        mp[entries.user.name]=entries.hours
-
-            for itr in mp:
-                self._prometheus_metrics['spent7days'].add_metric([itr], str(mp[itr]))
-
-            # spent time end
+        elif count >= user * 2 and count < user * 3:
+            color = 'yellow'
+        elif count >= user * 3:
+            color = 'red'
+        self._prometheus_metrics['issuecolor'].add_metric([project.name, color], count)
+        for metric in ['closedissues'] + list(STATUS_COUNTS):
+            self._prometheus_metrics[metric].add_metric([project.name], counts[metric])
+
+    def _collect_spenttime(self, redmine):
+        # One ranged, paged query over the widest window; every window is aggregated from it
+        today = datetime.datetime.now().date()
+        windows = sorted(set(SPENT_TIME_WINDOWS) | {7})
+        first_days = {days: today - datetime.timedelta(days=days - 1) for days in windows}
+
+        hours = {'user': Counter(), 'project': Counter(), 'activity': Counter()}
+        entries = redmine.time_entry.filter(from_date=first_days[windows[-1]], to_date=today)
+        for entry in entries.values('user', 'project', 'activity', 'hours', 'spent_on'):
+            spent_on = datetime.date.fromisoformat(entry['spent_on'])
+            for days in windows:
+                if spent_on >= first_days[days]:
+                    hours['user'][entry['user']['name'], days] += entry['hours']
+                    hours['project'][entry['project']['name'], days] += entry['hours']
+                    hours['activity'][entry['activity']['name'], days] += entry['hours']
+
+        for (user, days), total in hours['user'].items():
+            if days == 7:
+                self._prometheus_metrics['spent7days'].add_metric([user], total)
+            if days in SPENT_TIME_WINDOWS:
+                self._prometheus_metrics['spenttime'].add_metric([user, '%dd' % days], total)
+        for breakdown in SPENT_TIME_BREAKDOWNS:
+            for (name, days), total in hours[breakdown].items():
+                if days in SPENT_TIME_WINDOWS:
+                    self._prometheus_metrics['spenttime' + breakdown].add_metric([name, '%dd' % days], total)
+
+    def _issue_counts(self, redmine, projects):
+        # Open, closed and per-status counts for every project, grouped locally from the
+        # issue cache instead of a filtered query per project and status.
+        # Like Redmine's project_id filter, a project's counts include its subprojects.
+        closed_statuses = {status['id'] for status in redmine.issue_status.all().values() if status.get('is_closed')}
+        self._issues.sync(redmine)
+        parents = {}
+        for project in projects:
+            parent = project.raw().get('parent')
+            parents[project.id] = parent['id'] if parent else None
+
+        counts = {project.id: dict.fromkeys(['openissues', 'closedissues'] + list(STATUS_COUNTS), 0)
+                  for project in projects}
+        buckets = {status_id: metric for metric, status_id in STATUS_COUNTS.items()}
+        for (project_id, status_id), count in self._issues.counts.items():
+            metrics = ['closedissues' if status_id in closed_statuses else 'openissues']
+            if status_id in buckets:
+                metrics.append(buckets[status_id])
+            while project_id in counts:
+                for metric in metrics:
+                    counts[project_id][metric] += count
+                project_id = parents[project_id]
+        return counts
 
     def _setup_empty_prometheus_metrics(self):
         # The metrics we want to export.
@@ -223,21 +500,67 @@ class RedmineCollector(object):
         self._prometheus_metrics['closedissues'] = GaugeMetricFamily('redmine_project_closed_issues_total_count',
                                                                      'Redmine Project Closed Issues Count',
                                                                      labels=["projectname"])
-        self._prometheus_metrics['duedate'] = GaugeMetricFamily('redmine_project_issue_due_date',
-                                                                'Redmine Due by Today',
-                                                                labels=["projectname", "issueid", "status", "tracker",
-                                                                        "priority", "duedate", "author", "user"])
+        if CARDINALITY_MODE == 'aggregated':
+            self._prometheus_metrics['duedate'] = GaugeMetricFamily('redmine_project_issue_due_today_count',
+                                                                    'Redmine Issues Due by Today',
+                                                                    labels=LABEL_ALLOWLISTS['duedate'])
+        else:
+            self._prometheus_metrics['duedate'] = GaugeMetricFamily('redmine_project_issue_due_date',
+                                                                    'Redmine Due by Today',
+                                                                    labels=DETAIL_LABELS['duedate'])
 
         self._prometheus_metrics['issuecolor'] = GaugeMetricFamily('redmine_project_open_issues_color_total_count',
                                                                    'Redmine Project Open Issues Count color',
                                                                    labels=["projectname", "color"])
-        self._prometheus_metrics['meeting'] = GaugeMetricFamily('redmine_project_open_meeting_total_count',
-                                                                'Redmine Project Open meeting count',
-                                                                labels=["status", "watchers", "subject", "time",
-                                                                        "date"])
+        if CARDINALITY_MODE == 'aggregated':
+            self._prometheus_metrics['meeting'] = GaugeMetricFamily('redmine_project_upcoming_meeting_count',
+                                                                    'Redmine Project Upcoming meeting count',
+                                                                    labels=LABEL_ALLOWLISTS['meeting'])
+        else:
+            self._prometheus_metrics['meeting'] = GaugeMetricFamily('redmine_project_open_meeting_total_count',
+                                                                    'Redmine Project Open meeting count',
+                                                                    labels=DETAIL_LABELS['meeting'])
         self._prometheus_metrics['spent7days'] = GaugeMetricFamily('redmine_project_issue_spenttime_last_week_hours',
                                                                    'Redmine Project SpentTime Duration Hours Of Last Week',
                                                                    labels=["user"])
+        self._prometheus_metrics['spenttime'] = GaugeMetricFamily('redmine_spenttime_hours',
+                                                                  'Redmine SpentTime Hours per user over the trailing window',
+                                                                  labels=["user", "window"])
+        self._prometheus_metrics['spenttimeproject'] = GaugeMetricFamily('redmine_spenttime_project_hours',
+                                                                         'Redmine SpentTime Hours per project over the trailing window',
+                                                                         labels=["projectname", "window"])
+        self._prometheus_metrics['spenttimeactivity'] = GaugeMetricFamily('redmine_spenttime_activity_hours',
+                                                                          'Redmine SpentTime Hours per activity over the trailing window',
+                                                                          labels=["activity", "window"])
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def make_app(collector):
+    # /metrics for Prometheus, /details/duedate and /details/meetings?offset=&limit= for the per-issue rows
+    metrics_app = make_wsgi_app()
+
+    def app(environ, start_response):
+        request = Request(environ)
+        if request.path not in DETAIL_PATHS:
+            return metrics_app(environ, start_response)
+        try:
+            offset = int(request.args.get('offset', 0))
+            limit = int(request.args.get('limit', 100))
+        except ValueError:
+            offset = limit = -1
+        if offset < 0 or not 0 < limit <= 1000:
+            response = Response(json.dumps({'error': 'offset must be >= 0 and limit between 1 and 1000'}),
+                                status=400, mimetype='application/json')
+        else:
+            response = Response(json.dumps(collector.details(DETAIL_PATHS[request.path], offset, limit)),
+                                mimetype='application/json')
+        return response(environ, start_response)
+
+    return app
 
 
 def main():
@@ -245,8 +568,12 @@ def main():
         redmine = os.getenv('URL')
         api = os.getenv('API')
         port = int(os.getenv('PORT'))
-        REGISTRY.register(RedmineCollector(redmine, api))
-        start_http_server(port)
+        collector = RedmineCollector(redmine, api)
+        # registering runs a first collect(), which starts the background poller
+        REGISTRY.register(collector)
+        server = make_server('0.0.0.0', port, make_app(collector), threaded=True,
+                             request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
         print("Polling {}. Serving at port: {}".format(redmine, port))
         while True:
             time.sleep(1)